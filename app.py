@@ -1,858 +1,83 @@
-import os
-import shutil
-import sqlite3
-from datetime import date, datetime
+from datetime import date
+from functools import partial
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-import io
+
+# banco, consultas e migrações ficam em db.py: importado 1 vez por processo,
+# enquanto este arquivo é reexecutado pelo Streamlit a cada rerun
+from db import (
+    APTS,
+    FLOORS,
+    GM_EXPORT_COLUMNS,
+    GM_STATUSES,
+    REPORT_EXPORT_COLUMNS,
+    RESOLVED_EXPORT_COLUMNS,
+    STATUSES,
+    add_item,
+    backup_db,
+    build_unified_xlsx,
+    cleanup_empty_report,
+    count_general_maintenance,
+    count_reports,
+    delete_report_item,
+    df_to_csv_bytes,
+    fetch_daily_summary,
+    fetch_general_daily_summary,
+    fetch_general_maintenance,
+    fetch_pendencies_open,
+    fetch_pendencies_summary,
+    fetch_reports,
+    fetch_resolved,
+    init_db_once,
+    insert_general_maintenance,
+    insert_report,
+    list_items,
+    list_items_rows,
+    optimize_db_if_due,
+    resolve_general_maintenance,
+    resolve_pendency,
+    room_code,
+    set_items_active,
+)
 
 # ----------------------------
 # CONFIG
 # ----------------------------
 st.set_page_config(page_title="Hotel - Manutenção Diária", page_icon="🛠️", layout="wide")
 
-DB_PATH = "manutencao_hotel.db"
-STATUSES = ["OK", "Problema", "N/A"]
-
-
-# ----------------------------
-# HELPERS
-# ----------------------------
-def room_code(floor: int, apt: int) -> str:
-    return f"{floor:02d}{apt:02d}"
-
-def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-def fetch_pendencies_open(date_from: date, date_to: date, floor: int | None):
-    conn = get_conn()
-    query = """
-        SELECT
-            r.id AS report_id,
-            r.report_date,
-            r.room_code,
-            r.floor,
-            r.apt,
-            r.technician,
-            r.created_at,
-            ri.id AS report_item_id,
-            ri.item,
-            ri.status,
-            COALESCE(ri.note, '') AS note
-        FROM reports r
-        JOIN report_items ri ON ri.report_id = r.id
-        WHERE r.report_date BETWEEN ? AND ?
-          AND ri.status = 'Problema'
-          AND ri.resolved_at IS NULL
-    """
-    params = [date_from.isoformat(), date_to.isoformat()]
-
-    if floor is not None:
-        query += " AND r.floor = ?"
-        params.append(floor)
-
-    query += " ORDER BY r.report_date DESC, r.room_code ASC, r.id DESC;"
-
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
-
-def resolve_pendency(report_item_id: int, resolved_by: str, resolution_note: str):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        UPDATE report_items
-        SET
-          resolved_at = ?,
-          resolved_by = ?,
-          resolution_note = ?
-        WHERE id = ?
-          AND status = 'Problema'
-          AND resolved_at IS NULL;
-    """, (
-        datetime.now().isoformat(timespec="seconds"),
-        resolved_by.strip(),
-        (resolution_note.strip() or None),
-        report_item_id
-    ))
-
-    conn.commit()
-    conn.close()
-    
-def fetch_resolved(date_from: date, date_to: date, floor: int | None):
-        conn = get_conn()
-        query = """
-            SELECT
-                r.id AS report_id,
-                r.report_date,
-                r.room_code,
-                r.floor,
-                r.apt,
-                r.technician,
-                r.created_at,
-                ri.item,
-                ri.status,
-                COALESCE(ri.note, '') AS note,
-                ri.resolved_at,
-                COALESCE(ri.resolved_by, '') AS resolved_by,
-                COALESCE(ri.resolution_note, '') AS resolution_note
-            FROM reports r
-            JOIN report_items ri ON ri.report_id = r.id
-            WHERE r.report_date BETWEEN ? AND ?
-            AND ri.status = 'Problema'
-            AND ri.resolved_at IS NOT NULL
-        """
-        params = [date_from.isoformat(), date_to.isoformat()]
-
-        if floor is not None:
-            query += " AND r.floor = ?"
-            params.append(floor)
-
-        query += " ORDER BY ri.resolved_at DESC, r.room_code ASC;"
-
-        df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
-        return df
-
-GM_STATUSES = ["Aberto", "Em andamento", "Resolvido"]
-def insert_general_maintenance(maint_date: date, place: str, description: str, status: str, technician: str, note: str):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO general_maintenance
-        (maint_date, place, description, status, technician, note, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        maint_date.isoformat(),
-        place.strip(),
-        description.strip(),
-        status,
-        technician.strip(),
-        (note.strip() or None),
-        datetime.now().isoformat(timespec="seconds"),
-    ))
-
-    conn.commit()
-    conn.close()
-
-
-def fetch_general_maintenance(date_from: date, date_to: date, status: str | None, search: str | None):
-    conn = get_conn()
-
-    q = """
-        SELECT
-            id,
-            maint_date,
-            place,
-            description,
-            status,
-            technician,
-            COALESCE(note, '') AS note,
-            created_at,
-            COALESCE(resolved_at, '') AS resolved_at,
-            COALESCE(resolved_by, '') AS resolved_by,
-            COALESCE(resolution_note, '') AS resolution_note
-        FROM general_maintenance
-        WHERE maint_date BETWEEN ? AND ?
-    """
-    params = [date_from.isoformat(), date_to.isoformat()]
-
-    if status:
-        q += " AND status = ?"
-        params.append(status)
-
-    if search:
-        q += " AND (LOWER(place) LIKE ? OR LOWER(description) LIKE ? OR LOWER(technician) LIKE ?)"
-        s = f"%{search.lower().strip()}%"
-        params += [s, s, s]
-
-    q += " ORDER BY maint_date DESC, id DESC;"
-
-    df = pd.read_sql_query(q, conn, params=params)
-    conn.close()
-    return df
-
-def resolve_general_maintenance(gm_id: int, resolved_by: str, resolution_note: str):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        UPDATE general_maintenance
-        SET
-          status = 'Resolvido',
-          resolved_at = ?,
-          resolved_by = ?,
-          resolution_note = ?
-        WHERE id = ?;
-    """, (
-        datetime.now().isoformat(timespec="seconds"),
-        resolved_by.strip(),
-        (resolution_note.strip() or None),
-        gm_id
-    ))
-
-    conn.commit()
-    conn.close()
-
-def fetch_open_pendencies_apts(date_from: date, date_to: date, floor: int | None = None):
-    """
-    Pendências = itens com status 'Problema' em report_items
-    (não resolvidos ainda)
-    """
-    conn = get_conn()
-    q = """
-        SELECT
-            r.report_date,
-            r.room_code,
-            r.floor,
-            r.apt,
-            r.technician,
-            ri.item,
-            ri.status,
-            COALESCE(ri.note, '') AS note,
-            r.created_at,
-            r.id AS report_id
-        FROM reports r
-        JOIN report_items ri ON ri.report_id = r.id
-        WHERE r.report_date BETWEEN ? AND ?
-          AND ri.status = 'Problema'
-          AND (ri.resolved_at IS NULL OR ri.resolved_at = '')
-    """
-    params = [date_from.isoformat(), date_to.isoformat()]
-
-    if floor is not None:
-        q += " AND r.floor = ?"
-        params.append(int(floor))
-
-    q += " ORDER BY r.report_date DESC, r.room_code ASC;"
-
-    df = pd.read_sql_query(q, conn, params=params)
-    conn.close()
-    return df
-
-
-def dashboard_counts(date_from: date, date_to: date, floor: int | None = None):
-    # APTOS: pendências abertas
-    df_pend_open = fetch_open_pendencies_apts(date_from, date_to, floor)
-
-    # APTOS: resolvidas (usa sua função existente)
-    df_res = fetch_resolved(date_from, date_to, floor)
-
-    # GERAL: pega tudo e conta por status
-    df_gm = fetch_general_maintenance(date_from, date_to, status=None, search=None)
-
-    pendencias = len(df_pend_open)
-
-    # "Em andamento" vem da manutenção geral
-    em_andamento = 0
-    if not df_gm.empty:
-        em_andamento = int((df_gm["status"] == "Em andamento").sum())
-
-    # Concluídas = resolvidas aptos + gerais resolvidas
-    concluidas = len(df_res)
-    if not df_gm.empty:
-        concluidas += int((df_gm["status"] == "Resolvido").sum())
-
-    # "Abertas" gerais entram em pendências gerais (se quiser somar também)
-    gerais_abertas = 0
-    if not df_gm.empty:
-        gerais_abertas = int((df_gm["status"] == "Aberto").sum())
-
-    return {
-        "pendencias_apts_abertas": pendencias,
-        "gerais_abertas": gerais_abertas,
-        "em_andamento": em_andamento,
-        "concluidas": concluidas,
-        "df_pend_open": df_pend_open,
-        "df_res": df_res,
-        "df_gm": df_gm,
-    }
-
-
-def items_to_verify_by_room(date_from: date, date_to: date, floor: int | None = None):
-    """
-    Itens a verificar por quarto = itens ativos cadastrados - itens vistoriados no período.
-    Usa a lista de itens ativos e o fetch_reports do período.
-    """
-    items_df = list_items(active_only=True)
-    all_items = set(items_df["name"].astype(str).tolist()) if not items_df.empty else set()
-
-    # se não tem itens cadastrados, retorna vazio
-    if not all_items:
-        return pd.DataFrame(columns=["room_code", "qtd_faltando", "itens_faltando"])
-
-    df = fetch_reports(date_from, date_to, floor, None, None, technician=None, status=None)
-
-    # df tem item = nome do item
-    if df.empty:
-        # ninguém vistoriou nada no período
-        rooms = []
-        # gera lista de quartos conforme filtro
-        floors = [floor] if floor else list(range(1, 13))
-        for f in floors:
-            for a in range(1, 19):
-                rooms.append(room_code(int(f), int(a)))
-        return pd.DataFrame([{
-            "room_code": rc,
-            "qtd_faltando": len(all_items),
-            "itens_faltando": ", ".join(sorted(all_items))
-        } for rc in rooms]).sort_values(["room_code"])
-
-    # itens vistoriados por quarto
-    checked = (
-        df.groupby("room_code")["item"]
-          .apply(lambda s: set([str(x) for x in s.tolist()]))
-          .to_dict()
-    )
-
-    # gera todos os quartos (para não sumir quarto sem registro)
-    rooms = []
-    floors = [floor] if floor else list(range(1, 13))
-    for f in floors:
-        for a in range(1, 19):
-            rooms.append(room_code(int(f), int(a)))
-
-    rows = []
-    for rc in rooms:
-        done = checked.get(rc, set())
-        missing = sorted(list(all_items - done))
-        rows.append({
-            "room_code": rc,
-            "qtd_faltando": len(missing),
-            "itens_faltando": ", ".join(missing)
-        })
-
-    out = pd.DataFrame(rows).sort_values(["qtd_faltando", "room_code"], ascending=[False, True])
-    return out
-
-def export_unified_xlsx(df_apts: pd.DataFrame, df_resolved: pd.DataFrame, df_general: pd.DataFrame) -> bytes:
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        # Garantir que sempre exista a aba, mesmo vazia
-        (df_apts if not df_apts.empty else pd.DataFrame()).to_excel(writer, index=False, sheet_name="Aptos")
-        (df_resolved if not df_resolved.empty else pd.DataFrame()).to_excel(writer, index=False, sheet_name="Resolvidas Aptos")
-        (df_general if not df_general.empty else pd.DataFrame()).to_excel(writer, index=False, sheet_name="Manutenção Geral")
-    return output.getvalue()
-
-def delete_report_item(report_item_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # pega o report_id antes de deletar (pra limpeza opcional)
-    cur.execute("SELECT report_id FROM report_items WHERE id = ?", (report_item_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return False, None
-
-    report_id = int(row[0])
-
-    cur.execute("DELETE FROM report_items WHERE id = ?", (report_item_id,))
-
-    conn.commit()
-    conn.close()
-    return True, report_id
-
-
-def cleanup_empty_report(report_id: int):
-    """Se um report ficou sem itens, remove o report."""
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("SELECT COUNT(1) FROM report_items WHERE report_id = ?", (report_id,))
-    count_items = int(cur.fetchone()[0])
-
-    if count_items == 0:
-        cur.execute("DELETE FROM reports WHERE id = ?", (report_id,))
-        conn.commit()
-
-    conn.close()
-
-def fetch_daily_summary(target_date: date, floor: int | None = None):
-    """
-    Retorna 1 linha por quarto, com resumo do que foi feito no dia:
-    - itens OK
-    - itens Problema
-    - observações (note)
-    - técnico
-    - hora (último lançamento)
-    """
-    df = fetch_reports(target_date, target_date, floor, None, None, technician=None, status=None)
-
-    base_cols = ["report_date", "room_code", "floor", "apt", "technician", "ok_items", "problem_items", "notes", "last_time"]
-    if df is None or df.empty:
-        return pd.DataFrame(columns=base_cols)
-
-    # garantir strings
-    df = df.copy()
-    df["item"] = df["item"].fillna("").astype(str)
-    df["note"] = df["note"].fillna("").astype(str)
-    df["status"] = df["status"].fillna("").astype(str)
-    df["created_at"] = df["created_at"].fillna("").astype(str)
-
-    def join_unique(values) -> str:
-        """
-        Recebe lista/iterável de valores e devolve texto:
-        - remove vazios
-        - remove duplicados mantendo ordem
-        """
-        cleaned = []
-        for v in values:
-            s = str(v).strip()
-            if s:
-                cleaned.append(s)
-
-        seen = set()
-        out = []
-        for s in cleaned:
-            if s not in seen:
-                out.append(s)
-                seen.add(s)
-
-        return ", ".join(out)
-
-    def summarize_group(g: pd.DataFrame) -> pd.Series:
-        ok_items = join_unique(g.loc[g["status"] == "OK", "item"].tolist())
-        prob_items = join_unique(g.loc[g["status"] == "Problema", "item"].tolist())
-        notes = join_unique(g["note"].tolist())
-        last_time = str(g["created_at"].max() if not g["created_at"].empty else "")
-
-        # deixa bonito
-        ok_items = ok_items if ok_items else "—"
-        prob_items = prob_items if prob_items else "—"
-        notes = notes if notes else "—"
-        last_time = last_time.replace("T", " ")[:16] if last_time else "—"
-
-        return pd.Series(
-            {
-                "ok_items": ok_items,
-                "problem_items": prob_items,
-                "notes": notes,
-                "last_time": last_time,
-            }
-        )
-
-    resumo = (
-        df.groupby(["report_date", "room_code", "floor", "apt", "technician"], as_index=False)
-          .apply(lambda g: summarize_group(g), include_groups=False)
-          .reset_index()
-    )
-
-    # Algumas versões do pandas criam colunas extras; garantimos só o necessário:
-    # (se aparecer uma coluna "level_0" ou "index", remove)
-    for c in ["level_0", "index"]:
-        if c in resumo.columns:
-            resumo = resumo.drop(columns=[c])
-
-    # ordena por quarto
-    if "floor" in resumo.columns and "apt" in resumo.columns:
-        resumo = resumo.sort_values(["floor", "apt", "room_code"], ascending=[True, True, True])
-    else:
-        resumo = resumo.sort_values(["room_code"], ascending=True)
-
-    # garante que existe tudo que o dashboard usa
-    for col in base_cols:
-        if col not in resumo.columns:
-            resumo[col] = "—"
-
-    # mantém apenas colunas esperadas
-    return resumo[base_cols]
-
-def fetch_general_daily_summary(target_date: date):
-    """
-    Retorna manutenções gerais do dia (fora dos apartamentos).
-    Espera que sua tabela/consulta de manutenção geral tenha:
-    maint_date, place, description, status, technician, note, created_at,
-    resolved_at, resolved_by, resolution_note, id
-    """
-    df = fetch_general_maintenance(target_date, target_date, status=None, search=None)
-
-    cols = [
-        "maint_date", "place", "description", "status",
-        "technician", "note",
-        "resolved_at", "resolved_by", "resolution_note",
-        "created_at", "id"
-    ]
-    if df is None or df.empty:
-        return pd.DataFrame(columns=cols)
-
-    # garante colunas e strings
-    df = df.copy()
-    for c in cols:
-        if c not in df.columns:
-            df[c] = ""
-
-    # deixa bonito (horário)
-    df["created_at"] = df["created_at"].fillna("").astype(str).str.replace("T", " ").str.slice(0, 16)
-    df["resolved_at"] = df["resolved_at"].fillna("").astype(str).str.replace("T", " ").str.slice(0, 16)
-
-    # ordena: mais recentes primeiro
-    df = df.sort_values(["maint_date", "created_at", "id"], ascending=[False, False, False])
-
-    return df[cols]
-
-# ----------------------------
-# MIGRATIONS (produção)
-# ----------------------------
-def backup_db():
-    if not os.path.exists(DB_PATH):
-        return
-    os.makedirs("backups", exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    shutil.copy2(DB_PATH, f"backups/manutencao_hotel_{ts}.db")
-
-
-def ensure_schema_meta(cur):
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS schema_meta (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            version INTEGER NOT NULL
-        );
-    """)
-    cur.execute("INSERT OR IGNORE INTO schema_meta (id, version) VALUES (1, 1);")
-
-
-def get_schema_version(cur) -> int:
-    cur.execute("SELECT version FROM schema_meta WHERE id = 1;")
-    return int(cur.fetchone()[0])
-
-
-def set_schema_version(cur, v: int):
-    cur.execute("UPDATE schema_meta SET version = ? WHERE id = 1;", (v,))
-
-
-def table_has_column(cur, table: str, column: str) -> bool:
-    cur.execute(f"PRAGMA table_info({table});")
-    return any(row[1] == column for row in cur.fetchall())
-
-
-def migrate_if_needed(cur):
-    """
-    v1: reports com 'room' (1..216) e report_items com 'item' texto
-    v2: adiciona floor, apt, room_code e converte room -> floor/apt/room_code
-    v3: cria maintenance_items e adiciona item_id no report_items (itens cadastráveis)
-    v4: resolução das pendencias
-    """
-    ensure_schema_meta(cur)
-    v = get_schema_version(cur)
-
-    # --- v1 -> v2
-    if v < 2:
-        if not table_has_column(cur, "reports", "floor"):
-            cur.execute("ALTER TABLE reports ADD COLUMN floor INTEGER;")
-        if not table_has_column(cur, "reports", "apt"):
-            cur.execute("ALTER TABLE reports ADD COLUMN apt INTEGER;")
-        if not table_has_column(cur, "reports", "room_code"):
-            cur.execute("ALTER TABLE reports ADD COLUMN room_code TEXT;")
-
-        if table_has_column(cur, "reports", "room"):
-            cur.execute("""
-                UPDATE reports
-                SET
-                  floor = ((room - 1) / 18) + 1,
-                  apt   = ((room - 1) % 18) + 1
-                WHERE floor IS NULL OR apt IS NULL;
-            """)
-            cur.execute("""
-                UPDATE reports
-                SET room_code = printf('%02d%02d', floor, apt)
-                WHERE room_code IS NULL OR room_code = '';
-            """)
-
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date ON reports(report_date);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_roomcode ON reports(room_code);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_floor_apt ON reports(floor, apt);")
-
-        set_schema_version(cur, 2)
-        v = 2
-
-    # --- v2 -> v3 (itens cadastráveis)
-    if v < 3:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS maintenance_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
-                active INTEGER NOT NULL DEFAULT 1,
-                created_at TEXT NOT NULL
-            );
-        """)
-
-        if not table_has_column(cur, "report_items", "item_id"):
-            cur.execute("ALTER TABLE report_items ADD COLUMN item_id INTEGER;")
-
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_items_active ON maintenance_items(active);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_report_items_item_id ON report_items(item_id);")
-
-        set_schema_version(cur, 3)
-
-    # v4 - campos para resolver pendências
-    if v < 4:
-        if not table_has_column(cur, "report_items", "resolved_at"):
-            cur.execute("ALTER TABLE report_items ADD COLUMN resolved_at TEXT;")
-        if not table_has_column(cur, "report_items", "resolved_by"):
-            cur.execute("ALTER TABLE report_items ADD COLUMN resolved_by TEXT;")
-        if not table_has_column(cur, "report_items", "resolution_note"):
-            cur.execute("ALTER TABLE report_items ADD COLUMN resolution_note TEXT;")
-
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_report_items_resolved_at ON report_items(resolved_at);")
-
-        set_schema_version(cur, 4)
-
-def seed_default_items_if_empty():
-    defaults = [
-        "Fechadura Porta (Pilhas)",
-        "Cofre",
-        "Frigobar",
-        "Toalheiro",
-        "Suporte Papel",
-        "Ducha",
-        "Luzes",
-        "Televisao",
-        "Telefone",
-        "Abajur",
-        "Tomadas",
-        "Controles",
-        "Cortina",
-    ]
-
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM maintenance_items;")
-    count = cur.fetchone()[0]
-
-    if count == 0:
-        now = datetime.now().isoformat(timespec="seconds")
-        cur.executemany(
-            "INSERT INTO maintenance_items (name, active, created_at) VALUES (?, 1, ?)",
-            [(d, now) for d in defaults]
-        )
-    conn.commit()
-    conn.close()
-
-
-def init_db():
-    backup_db()
-
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Recomendo (melhora concorrência)
-    cur.execute("PRAGMA journal_mode=WAL;")
-    cur.execute("PRAGMA synchronous=NORMAL;")
-
-    # reports: mantém colunas antigas opcionais pra migração e compatibilidade
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_date TEXT NOT NULL,
-            technician TEXT NOT NULL,
-            created_at TEXT NOT NULL,   
-
-            floor INTEGER,
-            apt INTEGER,
-            room_code TEXT,
-
-            room INTEGER
-        );
-    """)
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS report_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_id INTEGER NOT NULL,
-            item_id INTEGER,
-            item TEXT NOT NULL,
-            status TEXT NOT NULL,
-            note TEXT,
-            FOREIGN KEY(report_id) REFERENCES reports(id)
-        );
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS general_maintenance (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        maint_date TEXT NOT NULL,
-        place TEXT NOT NULL,
-        description TEXT NOT NULL,
-        status TEXT NOT NULL,
-        technician TEXT NOT NULL,
-        note TEXT,
-        created_at TEXT NOT NULL,
-        resolved_at TEXT,
-        resolved_by TEXT,
-        resolution_note TEXT
-    );
-    """)
-
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_gm_date ON general_maintenance(maint_date);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_gm_status ON general_maintenance(status);")
-
-    migrate_if_needed(cur)
-
-    conn.commit()
-    conn.close()
-
-    # seed inicial (se não tiver nenhum item cadastrado ainda)
-    seed_default_items_if_empty()
-
 
 # ----------------------------
-# CRUD ITENS
+# HELPERS (UI)
 # ----------------------------
-def list_items(active_only: bool = True) -> pd.DataFrame:
-    conn = get_conn()
-    q = "SELECT id, name, active, created_at FROM maintenance_items"
-    if active_only:
-        q += " WHERE active = 1"
-    q += " ORDER BY name ASC;"
-    df = pd.read_sql_query(q, conn)
-    conn.close()
-    return df
-
-
-def normalize_item_name(name: str) -> str:
-    # remove espaços extras e padroniza
-    return " ".join(name.strip().split())
-
-
-def item_exists(name: str) -> bool:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 1 FROM maintenance_items
-        WHERE name = ?
-        COLLATE NOCASE
-        LIMIT 1;
-    """, (name,))
-    exists = cur.fetchone() is not None
-    conn.close()
-    return exists
-
-
-def add_item(name: str):
-    name = normalize_item_name(name)
-
-    if item_exists(name):
-        raise ValueError("Item já cadastrado.")
-
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO maintenance_items (name, active, created_at)
-        VALUES (?, 1, ?)
-    """, (name, datetime.now().isoformat(timespec="seconds")))
-    conn.commit()
-    conn.close()
-
-
-def set_item_active(item_id: int, active: bool):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("UPDATE maintenance_items SET active = ? WHERE id = ?", (1 if active else 0, item_id))
-    conn.commit()
-    conn.close()
+def page_controls(total: int, key: str) -> tuple[int, int]:
+    """Linhas por página + página; devolve (limit, offset) para o SQL."""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.number_input("Linhas por página", 100, 5000, 500, step=100, key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    # filtro mudou e a página guardada não existe mais -> volta para a última
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    with col2:
+        page = st.number_input("Página", min_value=1, max_value=pages, key=key)
+    with col3:
+        st.caption(f"Página {page} de {pages}")
+    return page_size, (page - 1) * page_size
 
 
-# ----------------------------
-# CRUD RELATÓRIOS
-# ----------------------------
-def insert_report(report_date: date, floor: int, apt: int, technician: str, items_payload: list[dict]):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    code = room_code(floor, apt)
-
-    cur.execute("""
-        INSERT INTO reports (report_date, floor, apt, room_code, technician, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        report_date.isoformat(),
-        floor,
-        apt,
-        code,
-        technician.strip(),
-        datetime.now().isoformat(timespec="seconds"),
-    ))
-
-    report_id = cur.lastrowid
-
-    cur.executemany("""
-        INSERT INTO report_items (report_id, item_id, item, status, note)
-        VALUES (?, ?, ?, ?, ?)
-    """, [
-        (report_id, row["item_id"], row["item"], row["status"], row.get("note", "").strip() or None)
-        for row in items_payload
-    ])
-
-    conn.commit()
-    conn.close()
-
-
-def fetch_reports(
-    date_from: date,
-    date_to: date,
-    floor: int | None,
-    apt: int | None,
-    room_code_filter: str | None,
-    technician: str | None,
-    status: str | None
-):
-    conn = get_conn()
-
-    query = """
-        SELECT
-            r.id AS report_id,
-            r.report_date,
-            r.floor,
-            r.apt,
-            r.room_code,
-            r.technician,
-            r.created_at,
-            ri.id AS report_item_id,
-            COALESCE(mi.name, ri.item) AS item,
-            ri.status,
-            COALESCE(ri.note, '') AS note
-        FROM reports r
-        JOIN report_items ri ON ri.report_id = r.id
-        LEFT JOIN maintenance_items mi ON mi.id = ri.item_id
-        WHERE r.report_date BETWEEN ? AND ?
-    """
-    params = [date_from.isoformat(), date_to.isoformat()]
-
-    if room_code_filter:
-        query += " AND r.room_code = ?"
-        params.append(room_code_filter.strip())
-
-    if floor is not None:
-        query += " AND r.floor = ?"
-        params.append(floor)
-
-    if apt is not None:
-        query += " AND r.apt = ?"
-        params.append(apt)
-
-    if technician:
-        query += " AND LOWER(r.technician) LIKE ?"
-        params.append(f"%{technician.lower().strip()}%")
-
-    if status:
-        query += " AND ri.status = ?"
-        params.append(status)
-
-    query += " ORDER BY r.report_date DESC, r.floor ASC, r.apt ASC, r.id DESC;"
-
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+def csv_bytes_of(fetch, *args, **kwargs) -> bytes:
+    """CSV do resultado completo (sem paginação), montado só no clique do download."""
+    return df_to_csv_bytes(fetch(*args, **kwargs))
 
 
 # ----------------------------
 # UI
 # ----------------------------
-init_db()
+init_db_once()
+backup_db()
+optimize_db_if_due()
 
 st.title("🛠️ Relatório Diário de Manutenção - Hotel")
 
@@ -873,7 +98,7 @@ st.sidebar.caption("Dados salvos localmente em SQLite (manutencao_hotel.db).")
 #     with c4:
 #         floor_val = None
 #         if floor_chk:
-#             floor_val = st.selectbox("Andar", list(range(1, 13)), index=0, key="dash_floor")
+#             floor_val = st.selectbox("Andar", FLOORS, index=0, key="dash_floor")
 
 #     if d_from > d_to:
 #         st.error("A data 'De' não pode ser maior que a data 'Até'.")
@@ -925,7 +150,7 @@ if menu == "Dashboard":
     with colB:
         floor_chk = st.checkbox("Filtrar por andar (apts)", value=False, key="dash_floor_chk")
     with colC:
-        floor = st.selectbox("Andar", list(range(1, 13)), index=0, key="dash_floor") if floor_chk else None
+        floor = st.selectbox("Andar", FLOORS, index=0, key="dash_floor") if floor_chk else None
     with colD:
         search = st.text_input(
             "Buscar (quarto/local/item/técnico)",
@@ -983,7 +208,7 @@ if menu == "Dashboard":
                 df_show = df_apts.copy()
 
             st.markdown("### ✅ Resumo do dia (1 linha por quarto)")
-            df_show["room_status"] = df_show["problem_items"].apply(lambda x: "⚠️ Pendente" if x != "—" else "✅ OK")
+            df_show["room_status"] = np.where(df_show["problem_items"] != "—", "⚠️ Pendente", "✅ OK")
 
             show_cols = ["room_code", "room_status", "technician", "ok_items", "problem_items", "notes", "last_time"]
 
@@ -1002,10 +227,9 @@ if menu == "Dashboard":
                 },
             )
 
-            csv = df_show[show_cols].to_csv(index=False).encode("utf-8-sig")
             st.download_button(
                 "⬇️ Baixar CSV (Aptos - dia)",
-                data=csv,
+                data=partial(df_to_csv_bytes, df_show[show_cols]),
                 file_name=f"dashboard_apts_{day.isoformat()}.csv",
                 mime="text/csv",
                 key="dash_apts_csv"
@@ -1060,10 +284,9 @@ if menu == "Dashboard":
                 },
             )
 
-            csv = df_show[show_cols].to_csv(index=False).encode("utf-8-sig")
             st.download_button(
                 "⬇️ Baixar CSV (Geral - dia)",
-                data=csv,
+                data=partial(df_to_csv_bytes, df_show[show_cols]),
                 file_name=f"dashboard_geral_{day.isoformat()}.csv",
                 mime="text/csv",
                 key="dash_gm_csv"
@@ -1078,103 +301,100 @@ elif menu == "Registrar manutenção":
     if "saving" not in st.session_state:
         st.session_state["saving"] = False
 
-    colA, colB, colC, colD = st.columns(4)
-    with colA:
-        report_date = st.date_input("Data", value=date.today())
-    with colB:
-        floor = st.selectbox("Andar", list(range(1, 13)), index=0)
-    with colC:
-        apt = st.selectbox("Apartamento (no andar)", list(range(1, 19)), index=0)
-    with colD:
-        code = room_code(floor, apt)
-        st.text_input("Quarto", value=code, disabled=True)
-
-    technician = st.text_input("Responsável / Técnico", placeholder="Ex: Gabriel / Manutenção")
-
-    items_df = list_items(active_only=True)
-    if items_df.empty:
-        st.warning("Nenhum item ativo cadastrado. Vá em 'Itens' e cadastre/ative os itens.")
-        st.stop()
-
-    st.markdown("### Itens vistoriados no quarto")
-    st.caption("Selecione apenas o que você realmente vistoriou/mexeu. O que não for selecionado não será salvo.")
-
-    options = [(int(r["id"]), r["name"]) for _, r in items_df.iterrows()]
-    name_by_id = {item_id: name for item_id, name in options}
-
-    selected_names = st.multiselect(
-        "Selecione os itens vistoriados",
-        options=[name for _, name in options],
-        placeholder="Ex: Frigobar, Luzes, Tomadas...",
-        key=f"vistoria_selected_names_{st.session_state['reset_token']}"
-    )
-
-    selected_ids = [item_id for item_id, name in options if name in selected_names]
-
-    st.markdown("### Detalhes dos itens selecionados")
-    items_payload = []
-
-    for item_id in selected_ids:
-        item_name = name_by_id[item_id]
-
-        # chaves por quarto+data+item para não "vazar" estado entre quartos
-        base_key = f"{report_date.isoformat()}_{code}_{item_id}"
-
-        with st.container(border=True):
-            c1, c2 = st.columns([1, 2])
-            with c1:
-                status = st.selectbox(
-                    item_name,
-                    ["OK", "Problema"],
-                    index=0,
-                    key=f"status_{base_key}",
-                )
-            with c2:
-                note = st.text_input(
-                    "Observação (opcional)",
-                    key=f"note_{base_key}",
-                    placeholder="Ex: trocado / ajustado / peça quebrada"
-                )
-
-        items_payload.append({
-            "item_id": item_id,
-            "item": item_name,
-            "status": status,
-            "note": note
-        })
-
-    st.markdown("---")
-    colS1, colS2 = st.columns([1, 3])
-    with colS1:
-        save = st.button("💾 Salvar relatório", type="primary", disabled=st.session_state["saving"])
-    with colS2:
-        st.caption("Cada item selecionado vira uma linha no relatório.")
-
-    if save:
-        if st.session_state["saving"]:
-            st.warning("Salvando... aguarde.")
+    # fragment: mudar quarto/data ou salvar reroda só este bloco, não a página inteira
+    # (sidebar, bootstrap do banco etc.); depois de salvar, st.rerun() volta ao app todo
+    @st.fragment
+    def register_fragment():
+        colA, colB, colC, colD = st.columns(4)
+        with colA:
+            report_date = st.date_input("Data", value=date.today())
+        with colB:
+            floor = st.selectbox("Andar", FLOORS, index=0)
+        with colC:
+            apt = st.selectbox("Apartamento (no andar)", APTS, index=0)
+        with colD:
+            code = room_code(floor, apt)
+            st.text_input("Quarto", value=code, disabled=True)
+
+        item_rows = list_items_rows(active_only=True)
+        if not item_rows:
+            st.warning("Nenhum item ativo cadastrado. Vá em 'Itens' e cadastre/ative os itens.")
             st.stop()
 
-        st.session_state["saving"] = True
+        # técnico + checklist num form: digitar observações não roda o script a cada campo,
+        # só no "Salvar" (data/andar/apto ficam fora porque definem o quarto e a chave do checklist)
+        with st.form("register_form"):
+            technician = st.text_input("Responsável / Técnico", placeholder="Ex: Gabriel / Manutenção")
+
+            st.markdown("### Itens vistoriados no quarto")
+            st.caption("Marque apenas o que você realmente vistoriou/mexeu. O que não for marcado não será salvo.")
+
+            # 1 widget só (data_editor) em vez de selectbox + text_input por item
+            checklist_df = pd.DataFrame({
+                "checked": False,
+                "item_id": [item_id for item_id, _, _ in item_rows],
+                "item": [name for _, name, _ in item_rows],
+                "status": "OK",
+                "note": "",
+            })
+
+            edited = st.data_editor(
+                checklist_df,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "checked": st.column_config.CheckboxColumn("Vistoriado", width="small"),
+                    "item_id": None,
+                    "item": st.column_config.TextColumn("Item", disabled=True),
+                    "status": st.column_config.SelectboxColumn("Status", options=["OK", "Problema"], required=True),
+                    "note": st.column_config.TextColumn("Observação (opcional)", width="large"),
+                },
+                # chave por quarto+data para não "vazar" estado entre quartos
+                key=f"checklist_{report_date.isoformat()}_{code}_{st.session_state['reset_token']}",
+            )
 
-        if not technician.strip():
-            st.session_state["saving"] = False
-            st.error("Informe o nome do responsável/técnico.")
-            st.stop()
+            st.markdown("---")
+            colS1, colS2 = st.columns([1, 3])
+            with colS1:
+                save = st.form_submit_button("💾 Salvar relatório", type="primary", disabled=st.session_state["saving"])
+            with colS2:
+                st.caption("Cada item marcado vira uma linha no relatório.")
+
+        selected = edited[edited["checked"]]
+
+        if save:
+            if st.session_state["saving"]:
+                st.warning("Salvando... aguarde.")
+                st.stop()
+
+            st.session_state["saving"] = True
+
+            if not technician.strip():
+                st.session_state["saving"] = False
+                st.error("Informe o nome do responsável/técnico.")
+                st.stop()
+
+            if selected.empty:
+                st.session_state["saving"] = False
+                st.error("Marque pelo menos 1 item vistoriado antes de salvar.")
+                st.stop()
+
+            insert_report(
+                report_date, int(floor), int(apt), technician,
+                selected["item_id"].tolist(),
+                selected["item"].tolist(),
+                selected["status"].tolist(),
+                selected["note"].fillna("").tolist(),
+            )
 
-        if not items_payload:
             st.session_state["saving"] = False
-            st.error("Selecione pelo menos 1 item vistoriado antes de salvar.")
-            st.stop()
+            st.success(f"Relatório salvo! ✅ (Quarto {code} - {report_date.strftime('%d/%m/%Y')})")
 
-        insert_report(report_date, int(floor), int(apt), technician, items_payload)
+            # reset do checklist (sem erro)
+            st.session_state["reset_token"] += 1
+            st.rerun()
 
-        st.session_state["saving"] = False
-        st.success(f"Relatório salvo! ✅ (Quarto {code} - {report_date.strftime('%d/%m/%Y')})")
-
-        # reset do multiselect (sem erro)
-        st.session_state["reset_token"] += 1
-        st.rerun()
+    register_fragment()
 
 elif menu == "Relatórios":
     st.subheader("Relatórios e exportação")
@@ -1190,34 +410,15 @@ elif menu == "Relatórios":
 
     uni_floor = None
     if uni_floor_chk:
-        uni_floor = st.selectbox("Andar", list(range(1, 13)), index=0, key="uni_floor")
+        uni_floor = st.selectbox("Andar", FLOORS, index=0, key="uni_floor")
 
     if uni_from > uni_to:
         st.error("A data 'De' não pode ser maior que a data 'Até'.")
     else:
-        # 1) Aptos (todos os status)
-        df_apts_uni = fetch_reports(uni_from, uni_to, uni_floor, None, None, technician=None, status=None)
-
-        # 2) Resolvidas aptos
-        df_res_uni = fetch_resolved(uni_from, uni_to, uni_floor)
-
-        # 3) Manutenção geral
-        df_gm_uni = fetch_general_maintenance(uni_from, uni_to, status=None, search=None)
-
-        # Colunas (padronizar para export)
-        cols_apts = ["report_date","room_code","floor","apt","technician","item","status","note","created_at","report_id"]
-        cols_res = ["report_date","room_code","floor","apt","item","note","resolved_at","resolved_by","resolution_note","technician","report_id"]
-        cols_gm = ["maint_date","place","description","status","technician","note","resolved_at","resolved_by","resolution_note","created_at","id"]
-
-        df_apts_uni = df_apts_uni[cols_apts] if not df_apts_uni.empty else pd.DataFrame(columns=cols_apts)
-        df_res_uni = df_res_uni[cols_res] if not df_res_uni.empty else pd.DataFrame(columns=cols_res)
-        df_gm_uni = df_gm_uni[cols_gm] if not df_gm_uni.empty else pd.DataFrame(columns=cols_gm)
-
-        xlsx_bytes = export_unified_xlsx(df_apts_uni, df_res_uni, df_gm_uni)
-
+        # consultas + planilha só no clique (e em cache por período/andar)
         st.download_button(
             "⬇️ Baixar Excel Unificado",
-            data=xlsx_bytes,
+            data=partial(build_unified_xlsx, uni_from, uni_to, uni_floor),
             file_name=f"relatorio_unificado_{uni_from.isoformat()}_a_{uni_to.isoformat()}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             key="uni_xlsx"
@@ -1231,65 +432,72 @@ elif menu == "Relatórios":
     # TAB 1 - RELATÓRIOS (igual ao seu, só que dentro do tab1)
     # -----------------------------
     with tab1:
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            date_from = st.date_input("De", value=date.today(), key="rep_de")
-        with col2:
-            date_to = st.date_input("Até", value=date.today(), key="rep_ate")
-        with col3:
-            filter_mode = st.selectbox(
-                "Filtrar por",
-                ["(nenhum)", "Andar/Apto", "Código do quarto (ex: 0101)"],
-                index=0,
-                key="rep_filter_mode"
-            )
-        with col4:
-            status = st.selectbox("Status do item", ["(todos)"] + STATUSES, index=0, key="rep_status")
-            status_val = None if status == "(todos)" else status
-
-        floor_val = None
-        apt_val = None
-        code_val = None
-
-        if filter_mode == "Andar/Apto":
-            cA, cB = st.columns(2)
-            with cA:
-                floor_val = st.selectbox("Andar (filtro)", list(range(1, 13)), index=0, key="rep_floor")
-            with cB:
-                apt_val = st.selectbox("Apto (filtro)", list(range(1, 19)), index=0, key="rep_apt")
-            code_val = room_code(int(floor_val), int(apt_val))
-
-        elif filter_mode == "Código do quarto (ex: 0101)":
-            code_val = st.text_input(
-                "Quarto (4 dígitos)",
-                placeholder="0101, 0218, 1203...",
-                key="rep_roomcode"
-            ).strip() or None
-
-        technician = st.text_input(
-            "Filtrar por responsável (contém)",
-            placeholder="Ex: gabriel / joão / terceirizada",
-            key="rep_tech"
+        # fora do form: muda quais campos de quarto aparecem
+        filter_mode = st.selectbox(
+            "Filtrar por",
+            ["(nenhum)", "Andar/Apto", "Código do quarto (ex: 0101)"],
+            index=0,
+            key="rep_filter_mode"
         )
 
+        # filtros num form: a consulta só roda de novo ao clicar em "Aplicar filtros"
+        with st.form("rep_filters"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                date_from = st.date_input("De", value=date.today(), key="rep_de")
+            with col2:
+                date_to = st.date_input("Até", value=date.today(), key="rep_ate")
+            with col3:
+                status = st.selectbox("Status do item", ["(todos)"] + STATUSES, index=0, key="rep_status")
+                status_val = None if status == "(todos)" else status
+
+            floor_val = None
+            apt_val = None
+            code_val = None
+
+            if filter_mode == "Andar/Apto":
+                cA, cB = st.columns(2)
+                with cA:
+                    floor_val = st.selectbox("Andar (filtro)", FLOORS, index=0, key="rep_floor")
+                with cB:
+                    apt_val = st.selectbox("Apto (filtro)", APTS, index=0, key="rep_apt")
+                code_val = room_code(int(floor_val), int(apt_val))
+
+            elif filter_mode == "Código do quarto (ex: 0101)":
+                code_val = st.text_input(
+                    "Quarto (4 dígitos)",
+                    placeholder="0101, 0218, 1203...",
+                    key="rep_roomcode"
+                ).strip() or None
+
+            technician = st.text_input(
+                "Filtrar por responsável (contém)",
+                placeholder="Ex: gabriel / joão / terceirizada",
+                key="rep_tech"
+            )
+
+            st.form_submit_button("🔎 Aplicar filtros")
+
         if date_from > date_to:
             st.error("A data 'De' não pode ser maior que a data 'Até'.")
         else:
-            df = fetch_reports(date_from, date_to, floor_val, apt_val, code_val, technician, status_val)
+            filters = (date_from, date_to, floor_val, apt_val, code_val, technician, status_val)
+            total = count_reports(*filters)
 
             st.markdown("### Resultado")
-            st.caption(f"{len(df)} linha(s) encontrada(s).")
+            st.caption(f"{total} linha(s) encontrada(s).")
 
-            if df.empty:
+            if total == 0:
                 st.info("Nada encontrado com esses filtros.")
             else:
-                show_cols = ["report_date", "room_code", "floor", "apt", "technician", "item", "status", "note", "created_at", "report_id"]
-                st.dataframe(df[show_cols], use_container_width=True, hide_index=True)
+                # só a página atual sai do SQLite e vai para o navegador; o CSV leva tudo
+                limit, offset = page_controls(total, "rep_page")
+                df = fetch_reports(*filters, columns=REPORT_EXPORT_COLUMNS, limit=limit, offset=offset)
+                st.dataframe(df, use_container_width=True, hide_index=True)
 
-                csv = df[show_cols].to_csv(index=False).encode("utf-8-sig")
                 st.download_button(
                     "⬇️ Baixar CSV",
-                    data=csv,
+                    data=partial(csv_bytes_of, fetch_reports, *filters, columns=REPORT_EXPORT_COLUMNS),
                     file_name=f"relatorio_manutencao_{date_from.isoformat()}_a_{date_to.isoformat()}.csv",
                     mime="text/csv",
                     key="rep_csv"
@@ -1320,10 +528,16 @@ elif menu == "Relatórios":
 
                         st.caption("Escolha uma linha para excluir (somente o item).")
 
-                        # seletor por ID do item
+                        # seletor por ID do item (zip das colunas: sem montar uma Series por linha)
                         options = [
-                            (int(r["report_item_id"]), f'{r["report_date"]} • {r["room_code"]} • {r["item"]} • {r["status"]}')
-                            for _, r in df_del.iterrows()
+                            (int(item_id), f"{rep_date} • {room} • {item} • {status}")
+                            for item_id, rep_date, room, item, status in zip(
+                                df_del["report_item_id"].to_numpy().tolist(),
+                                df_del["report_date"].to_numpy().tolist(),
+                                df_del["room_code"].astype(str).to_numpy().tolist(),
+                                df_del["item"].to_numpy().tolist(),
+                                df_del["status"].astype(str).to_numpy().tolist(),
+                            )
                         ]
 
                         selected = st.selectbox(
@@ -1352,40 +566,38 @@ elif menu == "Relatórios":
     with tab2:
         st.markdown("### Pendências resolvidas (quando, quem e o que foi feito)")
 
-        colA, colB, colC = st.columns(3)
-        with colA:
-            date_from_r = st.date_input("De (data do relatório)", value=date.today(), key="res_de")
-        with colB:
-            date_to_r = st.date_input("Até (data do relatório)", value=date.today(), key="res_ate")
-        with colC:
-            floor_filter_r = st.checkbox("Filtrar por andar", value=False, key="res_floor_chk")
+        # fora do form: mostra/esconde o campo de andar
+        floor_filter_r = st.checkbox("Filtrar por andar", value=False, key="res_floor_chk")
 
-        floor_val_r = None
-        if floor_filter_r:
-            floor_val_r = st.selectbox("Andar", list(range(1, 13)), index=0, key="res_floor")
+        with st.form("res_filters"):
+            colA, colB, colC = st.columns(3)
+            with colA:
+                date_from_r = st.date_input("De (data do relatório)", value=date.today(), key="res_de")
+            with colB:
+                date_to_r = st.date_input("Até (data do relatório)", value=date.today(), key="res_ate")
+
+            floor_val_r = None
+            if floor_filter_r:
+                with colC:
+                    floor_val_r = st.selectbox("Andar", FLOORS, index=0, key="res_floor")
+
+            st.form_submit_button("🔎 Aplicar filtros")
 
         if date_from_r > date_to_r:
             st.error("A data 'De' não pode ser maior que a data 'Até'.")
         else:
-            df_res = fetch_resolved(date_from_r, date_to_r, floor_val_r)
+            df_res = fetch_resolved(date_from_r, date_to_r, floor_val_r, columns=RESOLVED_EXPORT_COLUMNS)
 
             if df_res.empty:
                 st.info("Nenhuma pendência resolvida nesse período.")
             else:
                 st.success(f"{len(df_res)} pendência(s) resolvida(s) encontrada(s).")
 
-                show_cols_res = [
-                    "report_date", "room_code", "floor", "apt",
-                    "item", "note",
-                    "resolved_at", "resolved_by", "resolution_note",
-                    "technician", "report_id"
-                ]
-                st.dataframe(df_res[show_cols_res], use_container_width=True, hide_index=True)
+                st.dataframe(df_res, use_container_width=True, hide_index=True)
 
-                csv_res = df_res[show_cols_res].to_csv(index=False).encode("utf-8-sig")
                 st.download_button(
                     "⬇️ Baixar CSV (Resolvidas)",
-                    data=csv_res,
+                    data=partial(df_to_csv_bytes, df_res),
                     file_name=f"pendencias_resolvidas_{date_from_r.isoformat()}_a_{date_to_r.isoformat()}.csv",
                     mime="text/csv",
                     key="res_csv"
@@ -1396,43 +608,42 @@ elif menu == "Relatórios":
     with tab3:
         st.markdown("### Manutenção Geral (fora dos apartamentos)")
 
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            gm_from = st.date_input("De", value=date.today(), key="rep_gm_from")
-        with col2:
-            gm_to = st.date_input("Até", value=date.today(), key="rep_gm_to")
-        with col3:
-            gm_status = st.selectbox("Status", ["(todos)"] + GM_STATUSES, index=0, key="rep_gm_status")
-            gm_status_val = None if gm_status == "(todos)" else gm_status
+        with st.form("rep_gm_filters"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                gm_from = st.date_input("De", value=date.today(), key="rep_gm_from")
+            with col2:
+                gm_to = st.date_input("Até", value=date.today(), key="rep_gm_to")
+            with col3:
+                gm_status = st.selectbox("Status", ["(todos)"] + GM_STATUSES, index=0, key="rep_gm_status")
+                gm_status_val = None if gm_status == "(todos)" else gm_status
+
+            gm_search = st.text_input(
+                "Buscar (local/descrição/técnico)",
+                placeholder="Ex: elevador / recepção / gabriel",
+                key="rep_gm_search"
+            )
 
-        gm_search = st.text_input(
-            "Buscar (local/descrição/técnico)",
-            placeholder="Ex: elevador / recepção / gabriel",
-            key="rep_gm_search"
-        )
+            st.form_submit_button("🔎 Aplicar filtros")
 
         if gm_from > gm_to:
             st.error("A data 'De' não pode ser maior que a data 'Até'.")
         else:
-            df_gm = fetch_general_maintenance(gm_from, gm_to, gm_status_val, gm_search)
+            gm_filters = (gm_from, gm_to, gm_status_val, gm_search)
+            total_gm = count_general_maintenance(*gm_filters)
 
-            if df_gm.empty:
+            if total_gm == 0:
                 st.info("Nada encontrado.")
             else:
-                st.success(f"{len(df_gm)} registro(s) encontrado(s).")
+                st.success(f"{total_gm} registro(s) encontrado(s).")
 
-                show_cols_gm = [
-                    "maint_date", "place", "description", "status",
-                    "technician", "note",
-                    "resolved_at", "resolved_by", "resolution_note",
-                    "created_at", "id"
-                ]
-                st.dataframe(df_gm[show_cols_gm], use_container_width=True, hide_index=True)
+                limit, offset = page_controls(total_gm, "rep_gm_page")
+                df_gm = fetch_general_maintenance(*gm_filters, columns=GM_EXPORT_COLUMNS, limit=limit, offset=offset)
+                st.dataframe(df_gm, use_container_width=True, hide_index=True)
 
-                csv_gm = df_gm[show_cols_gm].to_csv(index=False).encode("utf-8-sig")
                 st.download_button(
                     "⬇️ Baixar CSV (Manutenção Geral)",
-                    data=csv_gm,
+                    data=partial(csv_bytes_of, fetch_general_maintenance, *gm_filters, columns=GM_EXPORT_COLUMNS),
                     file_name=f"relatorio_manutencao_geral_{gm_from.isoformat()}_a_{gm_to.isoformat()}.csv",
                     mime="text/csv",
                     key="rep_gm_csv"
@@ -1467,33 +678,35 @@ elif menu == "Manutenção Geral":
                 st.rerun()
 
     with tabG2:
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            df_from = st.date_input("De", value=date.today(), key="gm_from")
-        with col2:
-            df_to = st.date_input("Até", value=date.today(), key="gm_to")
-        with col3:
-            st_filter = st.selectbox("Status", ["(todos)"] + GM_STATUSES, index=0, key="gm_filter_status")
-            st_val = None if st_filter == "(todos)" else st_filter
+        # filtros num form: a busca só roda de novo ao clicar em "Aplicar filtros"
+        with st.form("gm_filters"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_from = st.date_input("De", value=date.today(), key="gm_from")
+            with col2:
+                df_to = st.date_input("Até", value=date.today(), key="gm_to")
+            with col3:
+                st_filter = st.selectbox("Status", ["(todos)"] + GM_STATUSES, index=0, key="gm_filter_status")
+                st_val = None if st_filter == "(todos)" else st_filter
+
+            search = st.text_input("Buscar (local/descrição/técnico)", placeholder="Ex: elevador / recepção / gabriel", key="gm_search")
 
-        search = st.text_input("Buscar (local/descrição/técnico)", placeholder="Ex: elevador / recepção / gabriel", key="gm_search")
+            st.form_submit_button("🔎 Aplicar filtros")
 
         if df_from > df_to:
             st.error("A data 'De' não pode ser maior que a data 'Até'.")
             st.stop()
 
-        df = fetch_general_maintenance(df_from, df_to, st_val, search)
+        df = fetch_general_maintenance(df_from, df_to, st_val, search, columns=GM_EXPORT_COLUMNS)
 
         if df.empty:
             st.info("Nada encontrado.")
         else:
-            show_cols = ["maint_date", "place", "description", "status", "technician", "note", "resolved_at", "resolved_by", "resolution_note", "created_at", "id"]
-            st.dataframe(df[show_cols], use_container_width=True, hide_index=True)
+            st.dataframe(df, use_container_width=True, hide_index=True)
 
-            csv = df[show_cols].to_csv(index=False).encode("utf-8-sig")
             st.download_button(
                 "⬇️ Baixar CSV (Manutenção Geral)",
-                data=csv,
+                data=partial(df_to_csv_bytes, df),
                 file_name=f"manutencao_geral_{df_from.isoformat()}_a_{df_to.isoformat()}.csv",
                 mime="text/csv",
                 key="gm_csv"
@@ -1504,13 +717,13 @@ elif menu == "Manutenção Geral":
 
             resolved_by = st.text_input("Quem resolveu?", placeholder="Ex: Gabriel / Manutenção", key="gm_res_by")
 
-            # Mostra só as que não estão resolvidas para resolver
-            pend = df[df["status"] != "Resolvido"].copy()
+            # Mostra só as que não estão resolvidas para resolver (filtradas já no SQLite)
+            pend = fetch_general_maintenance(df_from, df_to, st_val, search, columns=GM_EXPORT_COLUMNS, only_open=True)
 
             if pend.empty:
                 st.success("Nenhuma manutenção geral pendente ✅")
             else:
-                for _, row in pend.iterrows():
+                for row in pend.to_dict("records"):
                     gm_id = int(row["id"])
                     title = f"{row['maint_date']} • {row['place']} • {row['status']}"
                     with st.expander(title):
@@ -1532,17 +745,19 @@ elif menu == "Manutenção Geral":
 elif menu == "Pendências":
     st.subheader("Pendências (itens com PROBLEMA)")
 
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        date_from = st.date_input("De", value=date.today())
-    with col2:
-        date_to = st.date_input("Até", value=date.today())
-    with col3:
-        floor_filter = st.checkbox("Filtrar por andar", value=False)
+    # filtros num form: a consulta só roda de novo ao clicar em "Aplicar filtros"
+    with st.form("pend_filters"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_from = st.date_input("De", value=date.today())
+        with col2:
+            date_to = st.date_input("Até", value=date.today())
+        with col3:
+            floor_opt = st.selectbox("Andar (pendências)", ("(todos)",) + FLOORS, index=0)
+
+        st.form_submit_button("🔎 Aplicar filtros")
 
-    floor_val = None
-    if floor_filter:
-        floor_val = st.selectbox("Andar (pendências)", list(range(1, 13)), index=0)
+    floor_val = None if floor_opt == "(todos)" else floor_opt
 
     if date_from > date_to:
         st.error("A data 'De' não pode ser maior que a data 'Até'.")
@@ -1567,7 +782,9 @@ elif menu == "Pendências":
 
     st.caption("Abra uma pendência abaixo, descreva o que foi feito e marque como resolvida.")
 
-    for _, row in df.iterrows():
+    # dicts simples em vez de 1 pd.Series por linha (iterrows)
+    records = df[["report_item_id", "room_code", "item", "report_date", "note", "technician"]].to_dict("records")
+    for row in records:
         report_item_id = int(row["report_item_id"])
         room_code_val = row["room_code"]
         item_name = row["item"]
@@ -1600,13 +817,10 @@ elif menu == "Pendências":
 
     st.markdown("---")
     st.markdown("### Resumo por quarto (pendências abertas)")
-    resumo = (
-        df.groupby(["report_date", "room_code"])
-          .size()
-          .reset_index(name="qtd_pendencias")
-          .sort_values(["report_date", "room_code"], ascending=[False, True])
-    )
-    st.dataframe(resumo, use_container_width=True, hide_index=True)
+    # só consulta quando pedido (o corpo de um expander rodaria em todo rerun)
+    if st.checkbox("Mostrar resumo por quarto", value=False, key="pend_show_summary"):
+        resumo = fetch_pendencies_summary(date_from, date_to, floor_val)
+        st.dataframe(resumo, use_container_width=True, hide_index=True)
 
 elif menu == "Itens":
     st.subheader("Cadastro de Itens de Manutenção")
@@ -1623,8 +837,6 @@ elif menu == "Itens":
                     st.rerun()
                 except ValueError as e:
                     st.warning(str(e))
-                except sqlite3.IntegrityError:
-                    st.warning("Esse item já existe.")
 
     st.markdown("### Itens cadastrados")
     items_all = list_items(active_only=False)
@@ -1634,22 +846,32 @@ elif menu == "Itens":
     else:
         # Ajusta ativo para bool na visualização
         view_df = items_all.copy()
-        view_df["active"] = view_df["active"].apply(lambda x: "Sim" if int(x) == 1 else "Não")
+        view_df["active"] = np.where(view_df["active"].to_numpy(dtype=bool), "Sim", "Não")
         st.dataframe(view_df, use_container_width=True, hide_index=True)
 
         st.markdown("### Ativar / Desativar itens")
         st.caption("Desativar não apaga histórico; só remove do checklist novo.")
 
-        for _, r in items_all.iterrows():
-            item_id = int(r["id"])
-            name = r["name"]
-            active = bool(r["active"])
+        # 1 data_editor para todos os itens (em vez de um toggle por item);
+        # grava só as linhas alteradas, de uma vez, ao clicar em salvar
+        current = items_all[["id", "name", "active"]].astype({"active": bool})
+        edited = st.data_editor(
+            current,
+            column_config={
+                "name": st.column_config.TextColumn("Item"),
+                "active": st.column_config.CheckboxColumn("Ativo"),
+            },
+            disabled=["id", "name"],
+            hide_index=True,
+            use_container_width=True,
+            key="items_editor"
+        )
 
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.write(name)
-            with col2:
-                new_active = st.toggle("Ativo", value=active, key=f"active_{item_id}")
-                if new_active != active:
-                    set_item_active(item_id, new_active)
-                    st.rerun()
\ No newline at end of file
+        if st.button("💾 Salvar alterações", type="primary", key="items_save"):
+            changed = edited[edited["active"] != current["active"]]
+            if changed.empty:
+                st.info("Nenhuma alteração.")
+            else:
+                set_items_active(list(zip(changed["id"].tolist(), changed["active"].tolist())))
+                st.success(f"{len(changed)} item(ns) atualizado(s).")
+                st.rerun()
\ No newline at end of file
@@ -0,0 +1,1445 @@
+import atexit
+import glob
+import io
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import streamlit as st
+
+# ----------------------------
+# CONFIG
+# ----------------------------
+DB_PATH = "manutencao_hotel.db"
+STATUSES = ["OK", "Problema", "N/A"]
+# 12 andares x 18 apartamentos (tuplas: mesmas opções reaproveitadas em todos os selectbox)
+FLOORS = tuple(range(1, 13))
+APTS = tuple(range(1, 19))
+OPTIMIZE_EVERY_SECONDS = 15 * 60
+# statements preparados ficam em cache por conexão; como as conexões duram o processo todo,
+# um cache maior mantém todo o SQL do app já compilado (o padrão do sqlite3 é 128)
+CACHED_STATEMENTS = 256
+# linhas lidas do cursor por vez ao montar DataFrames (limita o pico de tuplas em memória)
+QUERY_CHUNK_ROWS = 10_000
+BACKUP_MIN_INTERVAL_SECONDS = 24 * 60 * 60
+# versão atual do schema (ver migrate_if_needed); espelhada em PRAGMA user_version
+SCHEMA_VERSION = 11
+# checkpoint automático mais cedo (padrão: 1000 páginas) e um PASSIVE manual a cada N salvamentos:
+# o custo de copiar o WAL para o banco fica diluído, sem picos no COMMIT de um salvamento
+WAL_AUTOCHECKPOINT_PAGES = 200
+WAL_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+CHECKPOINT_EVERY_SAVES = 20
+
+
+# ----------------------------
+# HELPERS
+# ----------------------------
+# 12 andares x 18 aptos: todos os códigos formatados uma vez só
+ROOM_CODES = {(f, a): f"{f:02d}{a:02d}" for f in FLOORS for a in APTS}
+
+def room_code(floor: int, apt: int) -> str:
+    code = ROOM_CODES.get((floor, apt))
+    return code if code is not None else f"{floor:02d}{apt:02d}"
+
+def fts_search_filter(text: str, fts_table: str, columns: tuple[str, ...]) -> tuple[str | None, list]:
+    """
+    Texto digitado -> subconsulta (rowids) na tabela FTS5 com tokenizer trigram: acha o trecho
+    em qualquer ponto do texto, como o antigo LIKE '%...%' ("abriel" acha "Gabriel").
+    Palavras com 3+ caracteres vão no MATCH (usa o índice); as mais curtas, em LIKE;
+    palavras sem nenhuma letra/número são ignoradas.
+    """
+    words = [w for w in text.split() if any(ch.isalnum() for ch in w)]
+    conds, params = [], []
+
+    long_words = [w for w in words if len(w) >= 3]
+    if long_words:
+        conds.append(f"{fts_table} MATCH ?")
+        params.append(" ".join('"' + w.replace('"', '""') + '"' for w in long_words))
+
+    for w in words:
+        if len(w) < 3:
+            conds.append("(" + " OR ".join(f"{c} LIKE ?" for c in columns) + ")")
+            params += [f"%{w}%"] * len(columns)
+
+    if not conds:
+        return None, []
+    return f"SELECT rowid FROM {fts_table} WHERE " + " AND ".join(conds), params
+
+def apply_conn_pragmas(conn):
+    """PRAGMAs de cache valem por conexão: aplicar em toda conexão aberta."""
+    conn.execute("PRAGMA busy_timeout=30000;")    # espera o lock em vez de falhar com SQLITE_BUSY
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")      # 64 MiB de páginas em memória
+    conn.execute("PRAGMA foreign_keys=ON;")        # report_items.report_id -> reports.id passa a ser verificado
+    conn.execute("PRAGMA mmap_size=268435456;")    # 256 MiB lidos direto do page cache do SO
+
+@st.cache_resource
+def get_write_conn():
+    """
+    Conexão única de escrita, compartilhada entre os reruns/sessões do Streamlit.
+    Abrir/fechar o SQLite a cada interação custa caro (arquivos WAL/SHM).
+    Use sempre via write_cursor(), que serializa as escritas.
+    isolation_level=None: as transações são abertas/fechadas explicitamente em write_cursor().
+    """
+    conn = sqlite3.connect(
+        DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=CACHED_STATEMENTS
+    )
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES};")
+    conn.execute(f"PRAGMA journal_size_limit={WAL_JOURNAL_SIZE_LIMIT};")
+    apply_conn_pragmas(conn)
+    atexit.register(close_write_conn, conn)
+    return conn
+
+
+def close_write_conn(conn):
+    """Ao encerrar o processo: PRAGMA optimize (recomendação do SQLite) e fecha a conexão."""
+    try:
+        conn.execute("PRAGMA optimize;")
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+@st.cache_resource
+def get_read_replica():
+    # stale: houve escrita deste processo desde a última cópia
+    # data_version: versão do arquivo no momento da cópia (ver get_data_version)
+    return {"conn": None, "stale": True, "data_version": None}
+
+
+@st.cache_resource
+def get_data_version_conn():
+    """Conexão ao arquivo só para ler PRAGMA data_version (e o lock para usá-la entre threads)."""
+    return {"conn": sqlite3.connect(DB_PATH, check_same_thread=False), "lock": threading.Lock()}
+
+
+def get_data_version() -> int:
+    """
+    Muda a cada commit feito por outra conexão no arquivo: a de escrita deste processo,
+    outro processo, o CLI do sqlite3 ou um backup restaurado pela API do SQLite.
+    """
+    probe = get_data_version_conn()
+    with probe["lock"]:
+        return probe["conn"].execute("PRAGMA data_version;").fetchone()[0]
+
+
+def refresh_read_replica():
+    """
+    Copia o banco (já commitado) para uma nova réplica em memória e troca a referência.
+    Quem ainda está lendo a réplica antiga termina nela; as próximas leituras pegam a nova.
+    """
+    with get_write_lock():
+        # lida antes da cópia: um commit de fora no meio do backup só gera mais uma cópia depois
+        version = get_data_version()
+        mem = sqlite3.connect(":memory:", check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+        get_write_conn().backup(mem)
+        replica = get_read_replica()
+        replica["conn"] = mem
+        replica["data_version"] = version
+        replica["stale"] = False
+
+
+def replica_is_stale(replica) -> bool:
+    return replica["stale"] or replica["data_version"] != get_data_version()
+
+
+def get_read_conn():
+    """
+    Leituras saem de uma réplica do banco em memória (sem I/O de disco a cada rerun).
+    write_cursor() só marca a réplica como desatualizada; a cópia é refeita aqui, na
+    próxima leitura: várias escritas seguidas (ex.: excluir + limpar relatório) custam 1 cópia.
+    Escritas de outros processos aparecem pelo PRAGMA data_version do arquivo.
+    """
+    replica = get_read_replica()
+    if replica_is_stale(replica):
+        with get_write_lock():
+            # outra sessão pode ter recarregado enquanto esperávamos o lock
+            if replica_is_stale(replica):
+                refresh_read_replica()
+    return replica["conn"]
+
+
+def query_df(conn, query: str, params=()) -> pd.DataFrame:
+    """
+    SELECT -> DataFrame direto do cursor (from_records), sem o caminho genérico
+    (e mais pesado) do pd.read_sql_query. Sem linhas, o DataFrame mantém as colunas.
+    Lê em blocos de QUERY_CHUNK_ROWS: nunca há mais que um bloco de tuplas Python vivo.
+    """
+    cur = conn.execute(query, params)
+    columns = [d[0] for d in cur.description]
+
+    chunks = []
+    while rows := cur.fetchmany(QUERY_CHUNK_ROWS):
+        chunks.append(pd.DataFrame.from_records(rows, columns=columns))
+
+    if not chunks:
+        return pd.DataFrame.from_records([], columns=columns)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+@st.cache_resource
+def get_write_lock():
+    # cache_resource (e não global do módulo): sobrevive também ao reload de db.py quando o arquivo muda
+    # RLock: get_read_conn() recarrega a réplica de leitura ainda segurando o lock
+    return threading.RLock()
+
+
+@contextmanager
+def write_cursor():
+    """
+    Um escritor por vez, numa única transação: commit no final, rollback se der erro.
+    BEGIN IMMEDIATE pega o lock de escrita logo no início, em vez de tentar
+    promover um lock de leitura no meio da transação (e perder para outro escritor).
+    """
+    with get_write_lock():
+        cur = get_write_conn().cursor()
+        cur.execute("BEGIN IMMEDIATE;")
+        try:
+            yield cur
+            cur.execute("COMMIT;")
+        except Exception:
+            cur.execute("ROLLBACK;")
+            raise
+
+        get_read_replica()["stale"] = True
+
+
+@st.cache_resource
+def get_optimize_state():
+    return {"last_run": time.monotonic()}
+
+
+def optimize_db_if_due():
+    """Roda PRAGMA optimize no máximo a cada OPTIMIZE_EVERY_SECONDS (recomendação do SQLite)."""
+    state = get_optimize_state()
+    if time.monotonic() - state["last_run"] < OPTIMIZE_EVERY_SECONDS:
+        return
+    state["last_run"] = time.monotonic()
+    with write_cursor() as cur:
+        cur.execute("PRAGMA optimize;")
+
+
+@st.cache_resource
+def get_checkpoint_state():
+    return {"saves": 0}
+
+
+def checkpoint_wal_if_due():
+    """PASSIVE não espera leitores nem bloqueia ninguém: copia o que der do WAL e volta."""
+    state = get_checkpoint_state()
+    with get_write_lock():
+        state["saves"] += 1
+        if state["saves"] < CHECKPOINT_EVERY_SAVES:
+            return
+        state["saves"] = 0
+        get_write_conn().execute("PRAGMA wal_checkpoint(PASSIVE);")
+
+
+def clear_report_caches():
+    """Invalida as leituras em cache de relatórios/pendências (chamar depois de escrever)."""
+    fetch_reports.clear()
+    count_reports.clear()
+    fetch_pendencies_open.clear()
+    fetch_pendencies_summary.clear()
+    fetch_resolved.clear()
+    fetch_open_pendencies_apts.clear()
+    fetch_daily_summary.clear()
+    build_unified_xlsx.clear()
+
+
+def clear_general_caches():
+    fetch_general_maintenance.clear()
+    count_general_maintenance.clear()
+    fetch_general_daily_summary.clear()
+    build_unified_xlsx.clear()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_pendencies_open(date_from: date, date_to: date, floor: int | None):
+    conn = get_read_conn()
+    query = """
+        SELECT
+            r.id AS report_id,
+            r.report_date,
+            r.room_code,
+            r.floor,
+            r.apt,
+            r.technician,
+            r.created_at,
+            ri.id AS report_item_id,
+            ri.item,
+            ri.status,
+            COALESCE(ri.note, '') AS note
+        FROM reports r
+        JOIN report_items ri ON ri.report_id = r.id
+        WHERE r.report_date BETWEEN ? AND ?
+          AND ri.status = 'Problema'
+          AND ri.resolved_at IS NULL
+    """
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if floor is not None:
+        query += " AND r.floor = ?"
+        params.append(floor)
+
+    query += " ORDER BY r.report_date DESC, r.room_code ASC, r.id DESC;"
+
+    df = query_df(conn, query, params)
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_pendencies_summary(date_from: date, date_to: date, floor: int | None):
+    """
+    Resumo por quarto das pendências abertas, já agregado no SQLite
+    (devolve 1 linha por data+quarto em vez de todas as pendências).
+    """
+    conn = get_read_conn()
+    query = """
+        SELECT
+            r.report_date,
+            r.room_code,
+            COUNT(*) AS qtd_pendencias
+        FROM reports r
+        JOIN report_items ri ON ri.report_id = r.id
+        WHERE r.report_date BETWEEN ? AND ?
+          AND ri.status = 'Problema'
+          AND ri.resolved_at IS NULL
+    """
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if floor is not None:
+        query += " AND r.floor = ?"
+        params.append(floor)
+
+    query += " GROUP BY r.report_date, r.room_code ORDER BY r.report_date DESC, r.room_code ASC;"
+
+    return query_df(conn, query, params)
+
+def resolve_pendency(report_item_id: int, resolved_by: str, resolution_note: str):
+    with write_cursor() as cur:
+        cur.execute("""
+            UPDATE report_items
+            SET
+              resolved_at = ?,
+              resolved_by = ?,
+              resolution_note = ?
+            WHERE id = ?
+              AND status = 'Problema'
+              AND resolved_at IS NULL;
+        """, (
+            datetime.now().isoformat(timespec="seconds"),
+            resolved_by.strip(),
+            (resolution_note.strip() or None),
+            report_item_id
+        ))
+
+    clear_report_caches()
+    
+# coluna -> expressão no SELECT; também serve de whitelist para o parâmetro columns
+RESOLVED_COLUMNS = {
+    "report_id": "r.id AS report_id",
+    "report_date": "r.report_date",
+    "room_code": "r.room_code",
+    "floor": "r.floor",
+    "apt": "r.apt",
+    "technician": "r.technician",
+    "created_at": "r.created_at",
+    "item": "ri.item",
+    "status": "ri.status",
+    "note": "COALESCE(ri.note, '') AS note",
+    "resolved_at": "ri.resolved_at",
+    "resolved_by": "COALESCE(ri.resolved_by, '') AS resolved_by",
+    "resolution_note": "COALESCE(ri.resolution_note, '') AS resolution_note",
+}
+RESOLVED_EXPORT_COLUMNS = (
+    "report_date", "room_code", "floor", "apt",
+    "item", "note",
+    "resolved_at", "resolved_by", "resolution_note",
+    "technician", "report_id",
+)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_resolved(date_from: date, date_to: date, floor: int | None, columns: tuple[str, ...] | None = None):
+    """columns: só essas colunas saem do SQLite (na ordem dada); None = todas."""
+    conn = get_read_conn()
+    select = ",\n            ".join(RESOLVED_COLUMNS[c] for c in (columns or RESOLVED_COLUMNS))
+    query = f"""
+        SELECT
+            {select}
+        FROM reports r
+        JOIN report_items ri ON ri.report_id = r.id
+        WHERE r.report_date BETWEEN ? AND ?
+        AND ri.status = 'Problema'
+        AND ri.resolved_at IS NOT NULL
+    """
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if floor is not None:
+        query += " AND r.floor = ?"
+        params.append(floor)
+
+    query += " ORDER BY ri.resolved_at DESC, r.room_code ASC;"
+
+    df = query_df(conn, query, params)
+    return df
+
+GM_STATUSES = ["Aberto", "Em andamento", "Resolvido"]
+def insert_general_maintenance(maint_date: date, place: str, description: str, status: str, technician: str, note: str):
+    with write_cursor() as cur:
+        cur.execute("""
+            INSERT INTO general_maintenance
+            (maint_date, place, description, status, technician, note, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            maint_date.isoformat(),
+            place.strip(),
+            description.strip(),
+            status,
+            technician.strip(),
+            (note.strip() or None),
+            datetime.now().isoformat(timespec="seconds"),
+        ))
+
+    clear_general_caches()
+
+
+def general_maintenance_where(
+    date_from: date, date_to: date, status: str | None, search: str | None, only_open: bool
+) -> tuple[str, list]:
+    """WHERE (e parâmetros) dos filtros de manutenção geral, comum à listagem e à contagem."""
+    where = "WHERE maint_date BETWEEN ? AND ?"
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if status:
+        where += " AND status = ?"
+        params.append(status)
+
+    if only_open:
+        # IN (e não != 'Resolvido'): assim o filtro usa o índice (status, maint_date)
+        open_statuses = [s for s in GM_STATUSES if s != "Resolvido"]
+        where += f" AND status IN ({', '.join('?' * len(open_statuses))})"
+        params += open_statuses
+
+    fts_query, fts_params = (
+        fts_search_filter(search, "general_maintenance_fts", ("place", "description", "technician"))
+        if search else (None, [])
+    )
+    if fts_query:
+        where += f" AND id IN ({fts_query})"
+        params += fts_params
+
+    return where, params
+
+GM_COLUMNS = {
+    "id": "id",
+    "maint_date": "maint_date",
+    "place": "place",
+    "description": "description",
+    "status": "status",
+    "technician": "technician",
+    "note": "COALESCE(note, '') AS note",
+    "created_at": "created_at",
+    "resolved_at": "COALESCE(resolved_at, '') AS resolved_at",
+    "resolved_by": "COALESCE(resolved_by, '') AS resolved_by",
+    "resolution_note": "COALESCE(resolution_note, '') AS resolution_note",
+}
+GM_EXPORT_COLUMNS = (
+    "maint_date", "place", "description", "status",
+    "technician", "note",
+    "resolved_at", "resolved_by", "resolution_note",
+    "created_at", "id",
+)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_general_maintenance(
+    date_from: date,
+    date_to: date,
+    status: str | None,
+    search: str | None,
+    columns: tuple[str, ...] | None = None,
+    only_open: bool = False,
+    limit: int | None = None,
+    offset: int = 0,
+):
+    """
+    columns: só essas colunas saem do SQLite (na ordem dada); None = todas.
+    only_open: só as que ainda não foram resolvidas.
+    limit/offset: uma página do resultado (None = tudo).
+    """
+    conn = get_read_conn()
+    select = ",\n            ".join(GM_COLUMNS[c] for c in (columns or GM_COLUMNS))
+    where, params = general_maintenance_where(date_from, date_to, status, search, only_open)
+
+    q = f"""
+        SELECT
+            {select}
+        FROM general_maintenance
+        {where}
+        ORDER BY maint_date DESC, id DESC
+    """
+
+    if limit is not None:
+        q += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+    df = query_df(conn, q, params)
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def count_general_maintenance(date_from: date, date_to: date, status: str | None, search: str | None) -> int:
+    where, params = general_maintenance_where(date_from, date_to, status, search, only_open=False)
+    return get_read_conn().execute(f"SELECT COUNT(*) FROM general_maintenance {where};", params).fetchone()[0]
+
+def resolve_general_maintenance(gm_id: int, resolved_by: str, resolution_note: str):
+    with write_cursor() as cur:
+        cur.execute("""
+            UPDATE general_maintenance
+            SET
+              status = 'Resolvido',
+              resolved_at = ?,
+              resolved_by = ?,
+              resolution_note = ?
+            WHERE id = ?;
+        """, (
+            datetime.now().isoformat(timespec="seconds"),
+            resolved_by.strip(),
+            (resolution_note.strip() or None),
+            gm_id
+        ))
+
+    clear_general_caches()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_open_pendencies_apts(date_from: date, date_to: date, floor: int | None = None):
+    """
+    Pendências = itens com status 'Problema' em report_items
+    (não resolvidos ainda)
+    """
+    conn = get_read_conn()
+    q = """
+        SELECT
+            r.report_date,
+            r.room_code,
+            r.floor,
+            r.apt,
+            r.technician,
+            ri.item,
+            ri.status,
+            COALESCE(ri.note, '') AS note,
+            r.created_at,
+            r.id AS report_id
+        FROM reports r
+        JOIN report_items ri ON ri.report_id = r.id
+        WHERE r.report_date BETWEEN ? AND ?
+          AND ri.status = 'Problema'
+          AND (ri.resolved_at IS NULL OR ri.resolved_at = '')
+    """
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if floor is not None:
+        q += " AND r.floor = ?"
+        params.append(int(floor))
+
+    q += " ORDER BY r.report_date DESC, r.room_code ASC;"
+
+    df = query_df(conn, q, params)
+    return df
+
+
+def dashboard_counts(date_from: date, date_to: date, floor: int | None = None):
+    # APTOS: pendências abertas
+    df_pend_open = fetch_open_pendencies_apts(date_from, date_to, floor)
+
+    # APTOS: resolvidas (usa sua função existente)
+    df_res = fetch_resolved(date_from, date_to, floor)
+
+    # GERAL: pega tudo e conta por status
+    df_gm = fetch_general_maintenance(date_from, date_to, status=None, search=None)
+
+    pendencias = len(df_pend_open)
+
+    # "Em andamento" vem da manutenção geral
+    em_andamento = 0
+    if not df_gm.empty:
+        em_andamento = int((df_gm["status"] == "Em andamento").sum())
+
+    # Concluídas = resolvidas aptos + gerais resolvidas
+    concluidas = len(df_res)
+    if not df_gm.empty:
+        concluidas += int((df_gm["status"] == "Resolvido").sum())
+
+    # "Abertas" gerais entram em pendências gerais (se quiser somar também)
+    gerais_abertas = 0
+    if not df_gm.empty:
+        gerais_abertas = int((df_gm["status"] == "Aberto").sum())
+
+    return {
+        "pendencias_apts_abertas": pendencias,
+        "gerais_abertas": gerais_abertas,
+        "em_andamento": em_andamento,
+        "concluidas": concluidas,
+        "df_pend_open": df_pend_open,
+        "df_res": df_res,
+        "df_gm": df_gm,
+    }
+
+
+def items_to_verify_by_room(date_from: date, date_to: date, floor: int | None = None):
+    """
+    Itens a verificar por quarto = itens ativos cadastrados - itens vistoriados no período.
+    Usa a lista de itens ativos e o fetch_reports do período.
+    """
+    all_items = {name for _, name, _ in list_items_rows(active_only=True)}
+
+    # se não tem itens cadastrados, retorna vazio
+    if not all_items:
+        return pd.DataFrame(columns=["room_code", "qtd_faltando", "itens_faltando"])
+
+    df = fetch_reports(date_from, date_to, floor, None, None, technician=None, status=None)
+
+    # df tem item = nome do item
+    if df.empty:
+        # ninguém vistoriou nada no período
+        # gera lista de quartos conforme filtro
+        floors = [int(floor)] if floor else FLOORS
+        rooms = [ROOM_CODES[(f, a)] for f in floors for a in APTS]
+        return pd.DataFrame([{
+            "room_code": rc,
+            "qtd_faltando": len(all_items),
+            "itens_faltando": ", ".join(sorted(all_items))
+        } for rc in rooms]).sort_values(["room_code"])
+
+    # itens vistoriados por quarto
+    checked = {}
+    for rc, item in zip(df["room_code"].astype(str), df["item"].astype(str)):
+        checked.setdefault(rc, set()).add(item)
+
+    # gera todos os quartos (para não sumir quarto sem registro)
+    floors = [int(floor)] if floor else FLOORS
+    rooms = [ROOM_CODES[(f, a)] for f in floors for a in APTS]
+
+    rows = []
+    for rc in rooms:
+        done = checked.get(rc, set())
+        missing = sorted(list(all_items - done))
+        rows.append({
+            "room_code": rc,
+            "qtd_faltando": len(missing),
+            "itens_faltando": ", ".join(missing)
+        })
+
+    out = pd.DataFrame(rows).sort_values(["qtd_faltando", "room_code"], ascending=[False, True])
+    return out
+
+def export_unified_xlsx(df_apts: pd.DataFrame, df_resolved: pd.DataFrame, df_general: pd.DataFrame) -> bytes:
+    """
+    Workbook write_only do openpyxl: as linhas vão direto para o arquivo, sem montar
+    uma célula-objeto por valor como o pd.ExcelWriter faz.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    sheets = [("Aptos", df_apts), ("Resolvidas Aptos", df_resolved), ("Manutenção Geral", df_general)]
+    for sheet_name, df in sheets:
+        # Garantir que sempre exista a aba, mesmo vazia
+        ws = wb.create_sheet(sheet_name)
+        if df.empty:
+            continue
+        ws.append(list(df.columns))
+        # NaN/NA viram célula vazia (como no to_excel)
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            ws.append(row)
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def build_unified_xlsx(date_from: date, date_to: date, floor: int | None) -> bytes:
+    """Excel unificado do período; cache invalidado junto com as leituras (clear_*_caches)."""
+    # 1) Aptos (todos os status)
+    # (já vêm só com as colunas do export, na ordem das planilhas)
+    df_apts = fetch_reports(
+        date_from, date_to, floor, None, None, technician=None, status=None, columns=REPORT_EXPORT_COLUMNS
+    )
+
+    # 2) Resolvidas aptos
+    df_res = fetch_resolved(date_from, date_to, floor, columns=RESOLVED_EXPORT_COLUMNS)
+
+    # 3) Manutenção geral
+    df_gm = fetch_general_maintenance(date_from, date_to, status=None, search=None, columns=GM_EXPORT_COLUMNS)
+
+    return export_unified_xlsx(df_apts, df_res, df_gm)
+
+@st.cache_data(ttl=300, max_entries=20, show_spinner=False)
+def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    CSV em utf-8-sig (abre certo no Excel), escrito direto num buffer e em blocos.
+    Usado como data=partial(df_to_csv_bytes, df) no download_button: só roda no clique.
+    Cache limitado (ttl + max_entries): cada combinação de filtros guarda um CSV inteiro.
+    """
+    output = io.BytesIO()
+    df.to_csv(output, index=False, encoding="utf-8-sig", chunksize=10_000)
+    return output.getvalue()
+
+def delete_report_item(report_item_id: int):
+    with write_cursor() as cur:
+        # pega o report_id antes de deletar (pra limpeza opcional)
+        cur.execute("SELECT report_id FROM report_items WHERE id = ?", (report_item_id,))
+        row = cur.fetchone()
+        if not row:
+            return False, None
+
+        report_id = int(row[0])
+
+        cur.execute("DELETE FROM report_items WHERE id = ?", (report_item_id,))
+
+    clear_report_caches()
+    return True, report_id
+
+
+def cleanup_empty_report(report_id: int):
+    """Se um report ficou sem itens, remove o report."""
+    with write_cursor() as cur:
+        cur.execute("SELECT COUNT(1) FROM report_items WHERE report_id = ?", (report_id,))
+        count_items = int(cur.fetchone()[0])
+
+        if count_items == 0:
+            cur.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+
+    clear_report_caches()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_daily_summary(target_date: date, floor: int | None = None):
+    """
+    Retorna 1 linha por quarto, com resumo do que foi feito no dia:
+    - itens OK
+    - itens Problema
+    - observações (note)
+    - técnico
+    - hora (último lançamento)
+    """
+    df = fetch_reports(target_date, target_date, floor, None, None, technician=None, status=None)
+
+    base_cols = ["report_date", "room_code", "floor", "apt", "technician", "ok_items", "problem_items", "notes", "last_time"]
+    if df is None or df.empty:
+        return pd.DataFrame(columns=base_cols)
+
+    # garantir strings
+    df = df.copy()
+    df["item"] = df["item"].fillna("").astype(str)
+    df["note"] = df["note"].fillna("").astype(str)
+    df["status"] = df["status"].fillna("").astype(str)
+    df["created_at"] = df["created_at"].fillna("").astype(str)
+
+    def join_unique(values) -> str:
+        """
+        Recebe lista/iterável de valores e devolve texto:
+        - remove vazios
+        - remove duplicados mantendo ordem
+        """
+        cleaned = []
+        for v in values:
+            s = str(v).strip()
+            if s:
+                cleaned.append(s)
+
+        seen = set()
+        out = []
+        for s in cleaned:
+            if s not in seen:
+                out.append(s)
+                seen.add(s)
+
+        return ", ".join(out)
+
+    def summarize_group(g: pd.DataFrame) -> pd.Series:
+        ok_items = join_unique(g.loc[g["status"] == "OK", "item"].tolist())
+        prob_items = join_unique(g.loc[g["status"] == "Problema", "item"].tolist())
+        notes = join_unique(g["note"].tolist())
+        last_time = str(g["created_at"].max() if not g["created_at"].empty else "")
+
+        # deixa bonito
+        ok_items = ok_items if ok_items else "—"
+        prob_items = prob_items if prob_items else "—"
+        notes = notes if notes else "—"
+        last_time = last_time.replace("T", " ")[:16] if last_time else "—"
+
+        return pd.Series(
+            {
+                "ok_items": ok_items,
+                "problem_items": prob_items,
+                "notes": notes,
+                "last_time": last_time,
+            }
+        )
+
+    resumo = (
+        df.groupby(["report_date", "room_code", "floor", "apt", "technician"], as_index=False, observed=True)
+          .apply(lambda g: summarize_group(g), include_groups=False)
+          .reset_index()
+    )
+
+    # Algumas versões do pandas criam colunas extras; garantimos só o necessário:
+    # (se aparecer uma coluna "level_0" ou "index", remove)
+    for c in ["level_0", "index"]:
+        if c in resumo.columns:
+            resumo = resumo.drop(columns=[c])
+
+    # ordena por quarto
+    if "floor" in resumo.columns and "apt" in resumo.columns:
+        resumo = resumo.sort_values(["floor", "apt", "room_code"], ascending=[True, True, True])
+    else:
+        resumo = resumo.sort_values(["room_code"], ascending=True)
+
+    # garante que existe tudo que o dashboard usa
+    for col in base_cols:
+        if col not in resumo.columns:
+            resumo[col] = "—"
+
+    # mantém apenas colunas esperadas
+    return resumo[base_cols]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_general_daily_summary(target_date: date):
+    """
+    Retorna manutenções gerais do dia (fora dos apartamentos).
+    Espera que sua tabela/consulta de manutenção geral tenha:
+    maint_date, place, description, status, technician, note, created_at,
+    resolved_at, resolved_by, resolution_note, id
+    """
+    df = fetch_general_maintenance(target_date, target_date, status=None, search=None)
+
+    cols = [
+        "maint_date", "place", "description", "status",
+        "technician", "note",
+        "resolved_at", "resolved_by", "resolution_note",
+        "created_at", "id"
+    ]
+    if df is None or df.empty:
+        return pd.DataFrame(columns=cols)
+
+    # garante colunas e strings
+    df = df.copy()
+    for c in cols:
+        if c not in df.columns:
+            df[c] = ""
+
+    # deixa bonito (horário)
+    df["created_at"] = df["created_at"].fillna("").astype(str).str.replace("T", " ").str.slice(0, 16)
+    df["resolved_at"] = df["resolved_at"].fillna("").astype(str).str.replace("T", " ").str.slice(0, 16)
+
+    # ordena: mais recentes primeiro
+    df = df.sort_values(["maint_date", "created_at", "id"], ascending=[False, False, False])
+
+    return df[cols]
+
+# ----------------------------
+# MIGRATIONS (produção)
+# ----------------------------
+def backup_db():
+    """
+    Cópia do banco em backups/, no máximo 1 por dia e só se o banco mudou
+    desde o último backup. Chamado a cada rerun (o intervalo é checado aqui),
+    como optimize_db_if_due.
+    """
+    if not os.path.exists(DB_PATH):
+        return
+    os.makedirs("backups", exist_ok=True)
+
+    backups = glob.glob("backups/*.db")
+    if backups:
+        last_backup = max(os.path.getmtime(f) for f in backups)
+        db_changed = max(os.path.getmtime(f) for f in (DB_PATH, f"{DB_PATH}-wal") if os.path.exists(f))
+        if db_changed <= last_backup or time.time() - last_backup < BACKUP_MIN_INTERVAL_SECONDS:
+            return
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # API de backup do SQLite (e não cópia do arquivo): inclui o que ainda está só no -wal
+    dest = sqlite3.connect(f"backups/manutencao_hotel_{ts}.db")
+    try:
+        with get_write_lock():
+            get_write_conn().backup(dest)
+    finally:
+        dest.close()
+
+
+def ensure_schema_meta(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+    """)
+    cur.execute("INSERT OR IGNORE INTO schema_meta (id, version) VALUES (1, 1);")
+
+
+def get_schema_version(cur) -> int:
+    cur.execute("SELECT version FROM schema_meta WHERE id = 1;")
+    return int(cur.fetchone()[0])
+
+
+def set_schema_version(cur, v: int):
+    cur.execute("UPDATE schema_meta SET version = ? WHERE id = 1;", (v,))
+
+
+def table_has_column(cur, table: str, column: str) -> bool:
+    cur.execute(f"PRAGMA table_info({table});")
+    return any(row[1] == column for row in cur.fetchall())
+
+
+def migrate_if_needed(cur):
+    """
+    v1: reports com 'room' (1..216) e report_items com 'item' texto
+    v2: adiciona floor, apt, room_code e converte room -> floor/apt/room_code
+    v3: cria maintenance_items e adiciona item_id no report_items (itens cadastráveis)
+    v4: resolução das pendencias
+    v5: índice de report_items para o join com reports e o filtro por status
+    v6: índice full-text (FTS5) do técnico dos relatórios
+    v7: índices compostos para os filtros de pendências (status/resolução + data/andar)
+    v8: sem alterações (índices redundantes removidos da série)
+    v9: índice full-text (FTS5) de local/descrição/técnico da manutenção geral
+    v10: índice (status, data) da manutenção geral, para listar só as abertas; remove idx_gm_status
+    v11: índice (data, quarto) dos relatórios, na ordem do resumo por quarto; remove idx_reports_date
+    """
+    ensure_schema_meta(cur)
+    v = get_schema_version(cur)
+
+    # --- v1 -> v2
+    if v < 2:
+        if not table_has_column(cur, "reports", "floor"):
+            cur.execute("ALTER TABLE reports ADD COLUMN floor INTEGER;")
+        if not table_has_column(cur, "reports", "apt"):
+            cur.execute("ALTER TABLE reports ADD COLUMN apt INTEGER;")
+        if not table_has_column(cur, "reports", "room_code"):
+            cur.execute("ALTER TABLE reports ADD COLUMN room_code TEXT;")
+
+        if table_has_column(cur, "reports", "room"):
+            # room -> floor/apt/room_code calculado de uma vez (numpy) e gravado
+            # num único UPDATE por linha, em vez de 2 UPDATEs na tabela inteira
+            cur.execute("""
+                SELECT id, room FROM reports
+                WHERE room IS NOT NULL
+                  AND (floor IS NULL OR apt IS NULL OR room_code IS NULL OR room_code = '');
+            """)
+            rows = cur.fetchall()
+            if rows:
+                ids, rooms = np.array(rows, dtype=np.int64).T
+                floors = (rooms - 1) // 18 + 1
+                apts = (rooms - 1) % 18 + 1
+                codes = np.char.add(np.char.zfill(floors.astype(str), 2), np.char.zfill(apts.astype(str), 2))
+                cur.executemany(
+                    "UPDATE reports SET floor = ?, apt = ?, room_code = ? WHERE id = ?;",
+                    zip(floors.tolist(), apts.tolist(), codes.tolist(), ids.tolist())
+                )
+
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date ON reports(report_date);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_roomcode ON reports(room_code);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_floor_apt ON reports(floor, apt);")
+
+        set_schema_version(cur, 2)
+        v = 2
+
+    # --- v2 -> v3 (itens cadastráveis)
+    if v < 3:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS maintenance_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                active INTEGER NOT NULL DEFAULT 1,
+                created_at TEXT NOT NULL
+            );
+        """)
+
+        if not table_has_column(cur, "report_items", "item_id"):
+            cur.execute("ALTER TABLE report_items ADD COLUMN item_id INTEGER;")
+
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_items_active ON maintenance_items(active);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_report_items_item_id ON report_items(item_id);")
+
+        set_schema_version(cur, 3)
+
+    # v4 - campos para resolver pendências
+    if v < 4:
+        if not table_has_column(cur, "report_items", "resolved_at"):
+            cur.execute("ALTER TABLE report_items ADD COLUMN resolved_at TEXT;")
+        if not table_has_column(cur, "report_items", "resolved_by"):
+            cur.execute("ALTER TABLE report_items ADD COLUMN resolved_by TEXT;")
+        if not table_has_column(cur, "report_items", "resolution_note"):
+            cur.execute("ALTER TABLE report_items ADD COLUMN resolution_note TEXT;")
+
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_report_items_resolved_at ON report_items(resolved_at);")
+
+        set_schema_version(cur, 4)
+
+    # v5 - índice de cobertura para o join (report_id) + filtro de status
+    if v < 5:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ri_report_status ON report_items(report_id, status, item_id);")
+
+        set_schema_version(cur, 5)
+
+    # v6 - busca por técnico via FTS5 (LIKE '%...%' não usa índice nenhum);
+    #      trigram: continua achando trechos no meio das palavras, como o LIKE
+    if v < 6:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                technician,
+                content='reports',
+                content_rowid='id',
+                tokenize='trigram'
+            );
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+                INSERT INTO reports_fts(rowid, technician) VALUES (new.id, new.technician);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+                INSERT INTO reports_fts(reports_fts, rowid, technician) VALUES ('delete', old.id, old.technician);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE OF technician ON reports BEGIN
+                INSERT INTO reports_fts(reports_fts, rowid, technician) VALUES ('delete', old.id, old.technician);
+                INSERT INTO reports_fts(rowid, technician) VALUES (new.id, new.technician);
+            END;
+        """)
+        # indexa o que já existe
+        cur.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild');")
+
+        set_schema_version(cur, 6)
+
+    # v7 - pendências abertas: busca por (status, resolved_at) nos itens
+    #      e por (data, andar) nos relatórios, sem ler a tabela inteira
+    if v < 7:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ri_status_resolved_report ON report_items(status, resolved_at, report_id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date_floor ON reports(report_date, floor);")
+
+        set_schema_version(cur, 7)
+
+    # v8 - sem alterações: os índices dessa versão repetiam o que idx_gm_date (a rowid entra
+    #      em todo índice) e idx_ri_status_resolved_report (v7) já atendem
+    if v < 8:
+        set_schema_version(cur, 8)
+
+    # v9 - busca da manutenção geral via FTS5 (3 LIKE '%...%' liam a tabela inteira);
+    #      trigram, como reports_fts (v6): continua achando trechos no meio das palavras
+    if v < 9:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS general_maintenance_fts USING fts5(
+                place,
+                description,
+                technician,
+                content='general_maintenance',
+                content_rowid='id',
+                tokenize='trigram'
+            );
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS general_maintenance_fts_ai AFTER INSERT ON general_maintenance BEGIN
+                INSERT INTO general_maintenance_fts(rowid, place, description, technician)
+                VALUES (new.id, new.place, new.description, new.technician);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS general_maintenance_fts_ad AFTER DELETE ON general_maintenance BEGIN
+                INSERT INTO general_maintenance_fts(general_maintenance_fts, rowid, place, description, technician)
+                VALUES ('delete', old.id, old.place, old.description, old.technician);
+            END;
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS general_maintenance_fts_au
+            AFTER UPDATE OF place, description, technician ON general_maintenance BEGIN
+                INSERT INTO general_maintenance_fts(general_maintenance_fts, rowid, place, description, technician)
+                VALUES ('delete', old.id, old.place, old.description, old.technician);
+                INSERT INTO general_maintenance_fts(rowid, place, description, technician)
+                VALUES (new.id, new.place, new.description, new.technician);
+            END;
+        """)
+        # indexa o que já existe
+        cur.execute("INSERT INTO general_maintenance_fts(general_maintenance_fts) VALUES ('rebuild');")
+
+        set_schema_version(cur, 9)
+
+    # v10 - manutenção geral em aberto: status IN (...) + faixa de datas pelo índice
+    if v < 10:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_gm_status_date ON general_maintenance(status, maint_date);")
+        # idx_gm_status(status) é prefixo deste: só custo na escrita
+        cur.execute("DROP INDEX IF EXISTS idx_gm_status;")
+
+        set_schema_version(cur, 10)
+
+    # v11 - resumo de pendências (GROUP BY report_date, room_code): reports já lido nessa ordem
+    if v < 11:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date_room ON reports(report_date, room_code);")
+        # idx_reports_date (v2) é prefixo deste e de idx_reports_date_floor (v7)
+        cur.execute("DROP INDEX IF EXISTS idx_reports_date;")
+
+        set_schema_version(cur, 11)
+
+    # lido direto do cabeçalho do arquivo: init_db() pula tudo isso no próximo start
+    cur.execute(f"PRAGMA user_version={SCHEMA_VERSION};")
+
+def seed_default_items_if_empty():
+    defaults = [
+        "Fechadura Porta (Pilhas)",
+        "Cofre",
+        "Frigobar",
+        "Toalheiro",
+        "Suporte Papel",
+        "Ducha",
+        "Luzes",
+        "Televisao",
+        "Telefone",
+        "Abajur",
+        "Tomadas",
+        "Controles",
+        "Cortina",
+    ]
+
+    # 1 comando só: os padrões entram apenas se a tabela ainda estiver vazia
+    values = ", ".join(["(?)"] * len(defaults))
+    with write_cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO maintenance_items (name, active, created_at)
+            SELECT column1, 1, ? FROM (VALUES {values})
+            WHERE NOT EXISTS (SELECT 1 FROM maintenance_items);
+        """, [datetime.now().isoformat(timespec="seconds"), *defaults])
+        inserted = cur.rowcount
+
+    if inserted > 0:
+        list_items.clear()
+        list_items_rows.clear()
+
+
+def create_tables(cur):
+    # reports: mantém colunas antigas opcionais pra migração e compatibilidade
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_date TEXT NOT NULL,
+            technician TEXT NOT NULL,
+            created_at TEXT NOT NULL,   
+
+            floor INTEGER,
+            apt INTEGER,
+            room_code TEXT,
+
+            room INTEGER
+        );
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS report_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            item_id INTEGER,
+            item TEXT NOT NULL,
+            status TEXT NOT NULL,
+            note TEXT,
+            FOREIGN KEY(report_id) REFERENCES reports(id)
+        );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS general_maintenance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        maint_date TEXT NOT NULL,
+        place TEXT NOT NULL,
+        description TEXT NOT NULL,
+        status TEXT NOT NULL,
+        technician TEXT NOT NULL,
+        note TEXT,
+        created_at TEXT NOT NULL,
+        resolved_at TEXT,
+        resolved_by TEXT,
+        resolution_note TEXT
+    );
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gm_date ON general_maintenance(maint_date);")
+
+
+def init_db():
+    backup_db()
+
+    # conexão própria e temporária: roda uma vez, antes da conexão compartilhada
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    cur = conn.cursor()
+    apply_conn_pragmas(conn)
+
+    # page_size só tem efeito em banco novo (antes da 1ª tabela e do WAL)
+    cur.execute("PRAGMA page_size=8192;")
+
+    # Recomendo (melhora concorrência)
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA synchronous=NORMAL;")
+
+    # banco já na versão atual: nem DDL nem migração (sem PRAGMA table_info a cada start)
+    cur.execute("PRAGMA user_version;")
+    if cur.fetchone()[0] < SCHEMA_VERSION:
+        # DDL + migrações numa única transação: um só commit, e tudo ou nada
+        cur.execute("BEGIN IMMEDIATE;")
+        try:
+            create_tables(cur)
+            migrate_if_needed(cur)
+            cur.execute("COMMIT;")
+        except Exception:
+            cur.execute("ROLLBACK;")
+            raise
+
+    conn.close()
+
+    # seed inicial (se não tiver nenhum item cadastrado ainda)
+    seed_default_items_if_empty()
+
+
+@st.cache_resource
+def init_db_once():
+    """init_db() (backup + DDL + migrações) 1 vez por processo, não a cada rerun."""
+    init_db()
+    return True
+
+
+# ----------------------------
+# CRUD ITENS
+# ----------------------------
+@st.cache_data(ttl=300, show_spinner=False)
+def list_items(active_only: bool = True) -> pd.DataFrame:
+    # catálogo muda pouco: cache invalidado em add_item / set_items_active
+    # mudanças feitas por fora do app aparecem quando o ttl vence
+    # (get_read_conn recarrega a réplica quando o data_version do arquivo muda)
+    conn = get_read_conn()
+    q = "SELECT id, name, active, created_at FROM maintenance_items"
+    if active_only:
+        q += " WHERE active = 1"
+    q += " ORDER BY name ASC;"
+
+    df = query_df(conn, q)
+    df[["id", "active"]] = df[["id", "active"]].astype("int32")
+    return df
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_items_rows(active_only: bool = True) -> list[tuple[int, str, int]]:
+    """
+    Mesmos dados de list_items(), mas como tuplas (id, name, active), sem pandas.
+    Para quem só itera os itens (checklist, toggles); list_items() fica para o st.dataframe.
+    """
+    conn = get_read_conn()
+    q = "SELECT id, name, active FROM maintenance_items"
+    if active_only:
+        q += " WHERE active = 1"
+    q += " ORDER BY name ASC;"
+    return conn.execute(q).fetchall()
+
+
+def normalize_item_name(name: str) -> str:
+    # remove espaços extras e padroniza
+    return " ".join(name.strip().split())
+
+
+def add_item(name: str):
+    name = normalize_item_name(name)
+
+    # UNIQUE COLLATE NOCASE em name já barra duplicados: um único INSERT,
+    # que não insere nada (rowcount 0) se o nome já existe
+    with write_cursor() as cur:
+        cur.execute("""
+            INSERT INTO maintenance_items (name, active, created_at)
+            VALUES (?, 1, ?)
+            ON CONFLICT(name) DO NOTHING
+        """, (name, datetime.now().isoformat(timespec="seconds")))
+        inserted = cur.rowcount
+
+    if inserted == 0:
+        raise ValueError("Item já cadastrado.")
+
+    list_items.clear()
+    list_items_rows.clear()
+
+
+def set_items_active(changes: list[tuple[int, bool]]):
+    # várias alterações de uma vez: um executemany numa única transação
+    if not changes:
+        return
+
+    with write_cursor() as cur:
+        cur.executemany(
+            "UPDATE maintenance_items SET active = ? WHERE id = ?",
+            [(1 if active else 0, int(item_id)) for item_id, active in changes],
+        )
+
+    list_items.clear()
+    list_items_rows.clear()
+
+
+# ----------------------------
+# CRUD RELATÓRIOS
+# ----------------------------
+def insert_report(
+    report_date: date,
+    floor: int,
+    apt: int,
+    technician: str,
+    item_ids: list[int],
+    item_names: list[str],
+    statuses: list[str],
+    notes: list[str],
+):
+    """Itens vêm em colunas paralelas (1 lista por campo), na ordem do INSERT em report_items."""
+    code = room_code(floor, apt)
+
+    with write_cursor() as cur:
+        cur.execute("""
+            INSERT INTO reports (report_date, floor, apt, room_code, technician, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, (
+            report_date.isoformat(),
+            floor,
+            apt,
+            code,
+            technician.strip(),
+            datetime.now().isoformat(timespec="seconds"),
+        ))
+
+        report_id = cur.fetchone()[0]
+
+        cur.executemany("""
+            INSERT INTO report_items (report_id, item_id, item, status, note)
+            VALUES (?, ?, ?, ?, ?)
+        """, zip(
+            itertools.repeat(report_id),
+            item_ids,
+            item_names,
+            statuses,
+            ((n or "").strip() or None for n in notes),
+        ))
+
+    clear_report_caches()
+    checkpoint_wal_if_due()
+
+
+def reports_where(
+    date_from: date,
+    date_to: date,
+    floor: int | None,
+    apt: int | None,
+    room_code_filter: str | None,
+    technician: str | None,
+    status: str | None,
+) -> tuple[str, list]:
+    """WHERE (e parâmetros) dos filtros de relatório, comum à listagem e à contagem."""
+    where = "WHERE r.report_date BETWEEN ? AND ?"
+    params = [date_from.isoformat(), date_to.isoformat()]
+
+    if room_code_filter:
+        where += " AND r.room_code = ?"
+        params.append(room_code_filter.strip())
+
+    if floor is not None:
+        where += " AND r.floor = ?"
+        params.append(floor)
+
+    if apt is not None:
+        where += " AND r.apt = ?"
+        params.append(apt)
+
+    fts_query, fts_params = fts_search_filter(technician, "reports_fts", ("technician",)) if technician else (None, [])
+    if fts_query:
+        where += f" AND r.id IN ({fts_query})"
+        params += fts_params
+
+    if status:
+        where += " AND ri.status = ?"
+        params.append(status)
+
+    return where, params
+
+@st.cache_data(ttl=60, show_spinner=False)
+def count_reports(
+    date_from: date,
+    date_to: date,
+    floor: int | None,
+    apt: int | None,
+    room_code_filter: str | None,
+    technician: str | None,
+    status: str | None,
+) -> int:
+    where, params = reports_where(date_from, date_to, floor, apt, room_code_filter, technician, status)
+    query = f"SELECT COUNT(*) FROM reports r JOIN report_items ri ON ri.report_id = r.id {where};"
+    return get_read_conn().execute(query, params).fetchone()[0]
+
+REPORT_COLUMNS = {
+    "report_id": "r.id AS report_id",
+    "report_date": "r.report_date",
+    "floor": "r.floor",
+    "apt": "r.apt",
+    "room_code": "r.room_code",
+    "technician": "r.technician",
+    "created_at": "r.created_at",
+    "report_item_id": "ri.id AS report_item_id",
+    "item": "COALESCE(mi.name, ri.item) AS item",
+    "status": "ri.status",
+    "note": "COALESCE(ri.note, '') AS note",
+}
+REPORT_EXPORT_COLUMNS = (
+    "report_date", "room_code", "floor", "apt", "technician",
+    "item", "status", "note", "created_at", "report_id",
+)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_reports(
+    date_from: date,
+    date_to: date,
+    floor: int | None,
+    apt: int | None,
+    room_code_filter: str | None,
+    technician: str | None,
+    status: str | None,
+    columns: tuple[str, ...] | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+):
+    # resultado depende só dos filtros: cache invalidado em insert_report / delete_report_item
+    # columns: só essas colunas saem do SQLite (na ordem dada); None = todas
+    # limit/offset: uma página do resultado (None = tudo, ex.: export)
+    conn = get_read_conn()
+    select = ",\n            ".join(REPORT_COLUMNS[c] for c in (columns or REPORT_COLUMNS))
+    where, params = reports_where(date_from, date_to, floor, apt, room_code_filter, technician, status)
+
+    query = f"""
+        SELECT
+            {select}
+        FROM reports r
+        JOIN report_items ri ON ri.report_id = r.id
+        LEFT JOIN maintenance_items mi ON mi.id = ri.item_id
+        {where}
+        ORDER BY r.report_date DESC, r.floor ASC, r.apt ASC, r.id DESC
+    """
+
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+    df = query_df(conn, query, params)
+
+    int_cols = [c for c in ("report_id", "report_item_id") if c in df.columns]
+    df[int_cols] = df[int_cols].astype("int32")
+    # floor/apt podem ser NULL (relatórios v1 sem 'room'): inteiro anulável
+    room_cols = [c for c in ("floor", "apt") if c in df.columns]
+    df[room_cols] = df[room_cols].astype("Int32")
+    # poucos valores distintos repetidos em muitas linhas -> category economiza memória
+    cat_cols = [c for c in ("status", "technician", "room_code") if c in df.columns]
+    df[cat_cols] = df[cat_cols].astype("category")
+    return df
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import sys
+from datetime import date
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Banco no formato v1 (reports.room + report_items.item), com um relatório sem quarto."""
+    monkeypatch.chdir(tmp_path)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.executescript("""
+        CREATE TABLE reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_date TEXT NOT NULL,
+            room INTEGER,
+            technician TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE report_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            item TEXT NOT NULL,
+            status TEXT NOT NULL,
+            note TEXT
+        );
+    """)
+    for room in (1, 19, None):
+        cur = conn.execute(
+            "INSERT INTO reports (report_date, room, technician, created_at) VALUES ('2024-01-01', ?, 'Gabriel', '2024-01-01T10:00:00')",
+            (room,),
+        )
+        conn.execute(
+            "INSERT INTO report_items (report_id, item, status) VALUES (?, 'Frigobar', 'Problema')",
+            (cur.lastrowid,),
+        )
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    yield
+    st.cache_resource.clear()
+
+
+def test_migrated_v1_report_without_room_keeps_null_floor_apt(legacy_db):
+    conn = sqlite3.connect(db.DB_PATH)
+    rows = conn.execute("SELECT room, floor, apt, room_code FROM reports ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(1, 1, 1, "0101"), (19, 2, 1, "0201"), (None, None, None, None)]
+
+
+def test_fetch_reports_with_null_floor_apt(legacy_db):
+    day = date(2024, 1, 1)
+    df = db.fetch_reports(day, day, None, None, None, technician=None, status=None)
+
+    assert len(df) == 3
+    assert str(df["floor"].dtype) == "Int32"
+    assert str(df["apt"].dtype) == "Int32"
+    assert df["floor"].isna().sum() == 1
+
+    # Dashboard (resumo do dia) também passa por fetch_reports
+    resumo = db.fetch_daily_summary(day)
+    assert resumo["room_code"].tolist() == ["0101", "0201"]
+    assert isinstance(resumo, pd.DataFrame)
+
+
+def test_migration_drops_redundant_indexes(legacy_db):
+    conn = sqlite3.connect(db.DB_PATH)
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+
+    assert "idx_ri_status_resolved_report" in indexes
+    assert {"idx_gm_date", "idx_gm_status_date"} <= indexes
+    assert {"idx_reports_date_floor", "idx_reports_date_room"} <= indexes
+    assert not indexes & {"idx_ri_status", "idx_ri_resolved_status", "idx_gm_date_id", "idx_gm_date_status", "idx_gm_status", "idx_reports_date"}
+
+
+def test_backup_includes_rows_still_in_wal(legacy_db):
+    with db.write_cursor() as cur:
+        cur.execute(
+            "INSERT INTO general_maintenance (maint_date, place, description, status, technician, created_at) "
+            "VALUES ('2024-01-01', 'Piscina', 'Filtro', 'Pendente', 'Ana', '2024-01-01T10:00:00')"
+        )
+    for f in os.listdir("backups"):
+        os.remove(os.path.join("backups", f))
+
+    db.backup_db()
+
+    (backup,) = os.listdir("backups")
+    conn = sqlite3.connect(os.path.join("backups", backup))
+    assert conn.execute("SELECT place FROM general_maintenance").fetchall() == [("Piscina",)]
+    conn.close()
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("abriel", 3),      # trecho no meio da palavra
+    ("GABRIEL", 3),
+    ("ga", 3),          # menos de 3 caracteres: LIKE
+    ("zzz", 0),
+    ("/", 3),           # só pontuação: ignorado
+])
+def test_technician_search_is_substring(legacy_db, term, expected):
+    day = date(2024, 1, 1)
+    assert db.count_reports(day, day, None, None, None, term, None) == expected
+
+
+def test_read_replica_sees_writes_from_other_connections(legacy_db):
+    before = {name for _, name, _ in db.list_items_rows(active_only=False)}
+
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("INSERT INTO maintenance_items (name, active, created_at) VALUES ('Interfone', 1, '2024-01-01T10:00:00')")
+    conn.commit()
+    conn.close()
+
+    db.list_items_rows.clear()
+    after = {name for _, name, _ in db.list_items_rows(active_only=False)}
+    assert after - before == {"Interfone"}
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("iltro", ["Piscina"]),         # trecho no meio da palavra (descrição)
+    ("ana", ["Piscina"]),           # técnico
+    ("ci", ["Piscina"]),            # menos de 3 caracteres: LIKE
+    ("troca filtro", []),
+    ("/", ["Piscina", "Recepção"]),  # só pontuação: ignorado
+])
+def test_general_maintenance_search_is_substring(legacy_db, term, expected):
+    with db.write_cursor() as cur:
+        cur.executemany(
+            "INSERT INTO general_maintenance (maint_date, place, description, status, technician, created_at) "
+            "VALUES ('2024-01-01', ?, ?, 'Pendente', ?, '2024-01-01T10:00:00')",
+            [("Piscina", "Limpeza do filtro", "Ana"), ("Recepção", "Troca de lâmpada", "Gabriel")],
+        )
+    db.fetch_general_maintenance.clear()
+
+    day = date(2024, 1, 1)
+    df = db.fetch_general_maintenance(day, day, None, term)
+    assert sorted(df["place"].tolist()) == expected